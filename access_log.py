@@ -0,0 +1,95 @@
+import logging
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+from fastapi import Request
+
+from config import settings
+from dependencies import peek_user_id
+
+access_logger = logging.getLogger("access")
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_queue_handler = QueueHandler(_queue)
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = getattr(record, "access", None) or {"message": record.getMessage()}
+        return orjson.dumps(entry).decode("utf-8")
+
+
+def start_access_log() -> None:
+    """Attach the queue handler; formatting and writing happen on the listener thread."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(_queue, handler)
+    _listener.start()
+    access_logger.addHandler(_queue_handler)
+
+
+def stop_access_log() -> None:
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    access_logger.removeHandler(_queue_handler)
+    _listener.stop()
+    _listener = None
+
+
+def _should_log(status_code: int, duration_ms: float) -> bool:
+    if status_code >= 400 or duration_ms >= settings.access_log_slow_ms:
+        return True
+    return random.random() < settings.access_log_sample_rate
+
+
+def _int_header(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def log_access(request: Request, call_next):
+    started_at = time.perf_counter()
+    status_code = 500
+    bytes_out = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        bytes_out = _int_header(response.headers.get("content-length"))
+        return response
+    finally:
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        if _should_log(status_code, duration_ms):
+            route = request.scope.get("route")
+            user_id = peek_user_id(request)
+            # The record carries the raw dict; JSON encoding is left to the listener thread
+            access_logger.info(
+                "access",
+                extra={
+                    "access": {
+                        "ts": datetime.now(timezone.utc).isoformat(),
+                        "method": request.method,
+                        "route": getattr(route, "path", request.url.path),
+                        "status": status_code,
+                        "duration_ms": round(duration_ms, 2),
+                        "bytes_in": _int_header(request.headers.get("content-length")),
+                        "bytes_out": bytes_out,
+                        "user_id": user_id.hex if user_id else None,
+                        "request_id": request.headers.get("x-request-id"),
+                    }
+                },
+            )
@@ -0,0 +1,153 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from uuid import UUID
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+from config import settings
+from dependencies import peek_user_id
+
+UPLOAD_PATH = "/files/upload"
+# Room for the multipart boundaries and part headers around a file of the maximum size
+MULTIPART_ALLOWANCE_BYTES = 64 * 1024
+
+
+@dataclass
+class _Usage:
+    uploads: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class Rejection:
+    status_code: int
+    code: str
+    message: str
+
+
+@dataclass
+class UploadAdmissionController:  # pylint: disable=too-many-instance-attributes
+    """Per-worker bookkeeping of in-flight uploads, reserved from `Content-Length`."""
+
+    max_inflight: int
+    max_inflight_bytes: int
+    max_inflight_per_user: int
+    max_inflight_bytes_per_user: int
+    _worker: _Usage = field(default_factory=_Usage)
+    _users: Dict[UUID, _Usage] = field(default_factory=dict)
+    _counters: Dict[str, int] = field(
+        default_factory=lambda: {"admitted": 0, "rejected_worker": 0, "rejected_user": 0}
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def try_acquire(self, user_id: Optional[UUID], nbytes: int) -> Optional[Rejection]:
+        with self._lock:
+            # A lone upload is always admitted byte-wise so a small worker budget cannot starve
+            # it; admit_uploads has already capped its size at the largest accepted upload
+            if self._worker.uploads + 1 > self.max_inflight or (
+                self._worker.uploads and self._worker.bytes + nbytes > self.max_inflight_bytes
+            ):
+                self._counters["rejected_worker"] += 1
+                return Rejection(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "upload_capacity_exceeded",
+                    "Server is busy processing uploads, retry later",
+                )
+            user_usage = self._users.get(user_id, _Usage()) if user_id else None
+            if user_usage is not None and (
+                user_usage.uploads + 1 > self.max_inflight_per_user
+                or user_usage.bytes + nbytes > self.max_inflight_bytes_per_user
+            ):
+                self._counters["rejected_user"] += 1
+                return Rejection(
+                    status.HTTP_429_TOO_MANY_REQUESTS,
+                    "too_many_uploads",
+                    "Too many concurrent uploads for this user, retry later",
+                )
+
+            self._worker.uploads += 1
+            self._worker.bytes += nbytes
+            if user_id:
+                user_usage = self._users.setdefault(user_id, _Usage())
+                user_usage.uploads += 1
+                user_usage.bytes += nbytes
+            self._counters["admitted"] += 1
+            return None
+
+    def release(self, user_id: Optional[UUID], nbytes: int) -> None:
+        with self._lock:
+            self._worker.uploads -= 1
+            self._worker.bytes -= nbytes
+            if user_id and (user_usage := self._users.get(user_id)):
+                user_usage.uploads -= 1
+                user_usage.bytes -= nbytes
+                if user_usage.uploads <= 0:
+                    del self._users[user_id]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "inflight_uploads": self._worker.uploads,
+                "inflight_bytes": self._worker.bytes,
+                "active_users": len(self._users),
+                "limits": {
+                    "max_inflight": self.max_inflight,
+                    "max_inflight_bytes": self.max_inflight_bytes,
+                    "max_inflight_per_user": self.max_inflight_per_user,
+                    "max_inflight_bytes_per_user": self.max_inflight_bytes_per_user,
+                },
+                **self._counters,
+            }
+
+
+upload_admission = UploadAdmissionController(
+    max_inflight=settings.upload_max_inflight,
+    max_inflight_bytes=settings.upload_max_inflight_bytes,
+    max_inflight_per_user=settings.upload_max_inflight_per_user,
+    max_inflight_bytes_per_user=settings.upload_max_inflight_bytes_per_user,
+)
+
+
+def _declared_length(request: Request) -> Optional[int]:
+    try:
+        return max(int(request.headers.get("content-length", "")), 0)
+    except ValueError:
+        return None
+
+
+async def admit_uploads(request: Request, call_next):
+    """Reserve upload capacity before the multipart body is read; shed excess load early."""
+    if request.method != "POST" or request.url.path != UPLOAD_PATH:
+        return await call_next(request)
+
+    declared_length = _declared_length(request)
+    if declared_length is not None and declared_length > (
+        settings.max_upload_size_bytes + MULTIPART_ALLOWANCE_BYTES
+    ):
+        # Reserving it would hold capacity for a body the route rejects once fully spooled
+        return JSONResponse(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            content={
+                "detail": {
+                    "code": "upload_too_large",
+                    "message": f"Upload too large; max {settings.max_upload_size_bytes} bytes",
+                }
+            },
+        )
+
+    user_id = peek_user_id(request)
+    # Chunked requests carry no length; assume the worst case the route would accept
+    nbytes = settings.max_upload_size_bytes if declared_length is None else declared_length
+    rejection = upload_admission.try_acquire(user_id, nbytes)
+    if rejection:
+        return JSONResponse(
+            status_code=rejection.status_code,
+            content={"detail": {"code": rejection.code, "message": rejection.message}},
+            headers={"Retry-After": str(settings.upload_retry_after_seconds)},
+        )
+    try:
+        return await call_next(request)
+    finally:
+        upload_admission.release(user_id, nbytes)
@@ -0,0 +1,64 @@
+"""track pending uploads and widen content type
+
+Revision ID: 26d633ddc89d
+Revises: 1f7490171e50
+Create Date: 2026-10-19 09:20:11.482113
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '26d633ddc89d'
+down_revision: Union[str, None] = '1f7490171e50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Widening a varchar is a catalog-only change in Postgres; no table rewrite
+    op.alter_column(
+        'file_assets',
+        'content_type',
+        existing_type=sa.String(length=16),
+        type_=sa.String(length=255),
+        existing_nullable=True,
+    )
+    op.create_table(
+        'pending_uploads',
+        sa.Column('owner_id', sa.UUID(), nullable=False),
+        sa.Column('stored_name', sa.String(length=537), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['owner_id'],
+            ['users.id'],
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stored_name'),
+    )
+    op.create_index(op.f('ix_pending_uploads_id'), 'pending_uploads', ['id'], unique=False)
+    op.create_index(
+        op.f('ix_pending_uploads_owner_id'), 'pending_uploads', ['owner_id'], unique=False
+    )
+    op.create_index(
+        op.f('ix_pending_uploads_expires_at'), 'pending_uploads', ['expires_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('pending_uploads')
+    op.execute('UPDATE file_assets SET content_type = NULL WHERE length(content_type) > 16')
+    op.alter_column(
+        'file_assets',
+        'content_type',
+        existing_type=sa.String(length=255),
+        type_=sa.String(length=16),
+        existing_nullable=True,
+    )
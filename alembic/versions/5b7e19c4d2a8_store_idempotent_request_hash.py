@@ -0,0 +1,29 @@
+"""store idempotent request hash
+
+Revision ID: 5b7e19c4d2a8
+Revises: cf28a22c2e6c
+Create Date: 2026-10-20 10:12:44.918305
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e19c4d2a8'
+down_revision: Union[str, None] = 'cf28a22c2e6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'idempotency_keys', sa.Column('request_hash', sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'request_hash')
@@ -0,0 +1,31 @@
+"""add file image details
+
+Revision ID: 9bc347205012
+Revises: 9e328c5b6c69
+Create Date: 2026-10-18 14:03:12.771904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9bc347205012'
+down_revision: Union[str, None] = '9e328c5b6c69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('file_assets', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('file_assets', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('file_assets', sa.Column('placeholder', sa.String(length=512), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('file_assets', 'placeholder')
+    op.drop_column('file_assets', 'height')
+    op.drop_column('file_assets', 'width')
@@ -0,0 +1,78 @@
+"""add file search indexes
+
+Revision ID: 9e328c5b6c69
+Revises: fd4b69a5c7c5
+Create Date: 2026-10-18 10:12:40.318251
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9e328c5b6c69'
+down_revision: Union[str, None] = 'fd4b69a5c7c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Build concurrently so writes to file_assets are not blocked on large tables, and
+    # create the replacement before dropping the old owner/created_at index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_file_assets_owner_id_created_at_id',
+            'file_assets',
+            ['owner_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_file_assets_owner_id_created_at',
+            table_name='file_assets',
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_file_assets_owner_id_content_type_created_at',
+            'file_assets',
+            ['owner_id', 'content_type', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_file_assets_display_name_trgm',
+            'file_assets',
+            ['display_name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'display_name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_file_assets_owner_id_created_at',
+            'file_assets',
+            ['owner_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_file_assets_display_name_trgm',
+            table_name='file_assets',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_file_assets_owner_id_content_type_created_at',
+            table_name='file_assets',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_file_assets_owner_id_created_at_id',
+            table_name='file_assets',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,27 @@
+"""store idempotent response headers
+
+Revision ID: a04d532b4933
+Revises: 26d633ddc89d
+Create Date: 2026-10-19 14:02:37.615904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a04d532b4933'
+down_revision: Union[str, None] = '26d633ddc89d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_keys', sa.Column('response_headers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'response_headers')
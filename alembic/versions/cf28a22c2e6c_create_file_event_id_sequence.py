@@ -0,0 +1,27 @@
+"""create file event id sequence
+
+Revision ID: cf28a22c2e6c
+Revises: a04d532b4933
+Create Date: 2026-10-19 16:48:52.307716
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf28a22c2e6c'
+down_revision: Union[str, None] = 'a04d532b4933'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('file_event_id_seq')))
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence('file_event_id_seq')))
@@ -0,0 +1,61 @@
+import argparse
+import logging
+from pathlib import Path
+from typing import Tuple
+
+from fastapi import HTTPException
+from storage3.exceptions import StorageException
+
+import models
+import storage
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def backfill(batch_size: int) -> Tuple[int, int]:
+    """Fill width/height/placeholder for images uploaded before they were recorded."""
+    updated = 0
+    failed = 0
+    last_id = None
+    db = SessionLocal()
+    try:
+        while True:
+            query = db.query(models.FileAsset).filter(
+                models.FileAsset.content_type.startswith("image/"),
+                models.FileAsset.width.is_(None),
+            )
+            if last_id is not None:
+                query = query.filter(models.FileAsset.id > last_id)
+            assets = query.order_by(models.FileAsset.id).limit(batch_size).all()
+            if not assets:
+                return updated, failed
+            for asset in assets:
+                try:
+                    image = storage.describe_stored_image(
+                        Path(asset.owner_id.hex), asset.stored_name
+                    )
+                except (StorageException, HTTPException) as exc:
+                    # Missing objects and storage outages skip the row; a later run retries it
+                    logger.warning("Skipped file %s: %r", asset.id, exc)
+                    failed += 1
+                    continue
+                if image:
+                    asset.width = image.width
+                    asset.height = image.height
+                    asset.placeholder = image.placeholder
+                    updated += 1
+            db.commit()
+            last_id = assets[-1].id
+            logger.info("Backfilled %d images so far (%d skipped)", updated, failed)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=backfill.__doc__)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    total_updated, total_failed = backfill(args.batch_size)
+    logger.info("Backfilled %d images; %d skipped", total_updated, total_failed)
@@ -0,0 +1,146 @@
+"""Compare the old and new `GET /files` serialization paths on 100-item pages.
+
+Seeds its own in-memory SQLite database, so it needs no Postgres or Supabase:
+
+    DATABASE_URL=sqlite:// python -m benchmarks.list_serialization --items 100 --rounds 500
+
+"old" loads ORM entities, builds FileListResponse and lets FastAPI re-validate and encode it
+against response_model; "new" is what list_files does now (column mappings, one TypeAdapter
+pass, ORJSONResponse).
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import models
+import schemas
+from database import Base
+from routers.files import _FILE_OUT_COLUMNS
+
+PLACEHOLDER = "data:image/webp;base64," + "A" * 120
+
+
+def seed(session: Session, items: int) -> uuid.UUID:
+    owner = models.User(email="bench@example.com", hashed_password="-")
+    session.add(owner)
+    session.flush()
+    now = datetime.now(timezone.utc)
+    session.add_all(
+        models.FileAsset(
+            display_name=f"holiday-photo-{i}.jpg",
+            stored_name=f"{owner.id.hex}/{uuid.uuid4().hex}.jpg",
+            thumbnail_name=f"{owner.id.hex}/{uuid.uuid4().hex}.png",
+            content_type="image/jpeg",
+            size=1_000_000 + i,
+            width=4032,
+            height=3024,
+            placeholder=PLACEHOLDER,
+            owner_id=owner.id,
+            created_at=now - timedelta(seconds=i),
+            updated_at=now,
+        )
+        for i in range(items)
+    )
+    session.commit()
+    return owner.id
+
+
+def _page(owner_id: uuid.UUID, *columns, limit: int):
+    return (
+        select(*columns)
+        .where(models.FileAsset.owner_id == owner_id)
+        .order_by(models.FileAsset.created_at.desc())
+        .limit(limit)
+    )
+
+
+async def serialize_old(items, total: int, field) -> bytes:
+    content = schemas.FileListResponse(
+        total=total, items=[schemas.FileOut.model_validate(item) for item in items]
+    )
+    encoded = await serialize_response(field=field, response_content=content)
+    return JSONResponse(content=encoded).body
+
+
+def serialize_new(rows, total: int) -> bytes:
+    items = schemas.file_out_list_adapter.validate_python(rows)
+    return ORJSONResponse(
+        content={"total": total, "items": schemas.file_out_list_adapter.dump_python(items)}
+    ).body
+
+
+async def old_path(session: Session, owner_id: uuid.UUID, limit: int, field) -> bytes:
+    items = session.scalars(_page(owner_id, models.FileAsset, limit=limit)).all()
+    return await serialize_old(items, limit, field)
+
+
+async def new_path(session: Session, owner_id: uuid.UUID, limit: int, _field) -> bytes:
+    rows = session.execute(_page(owner_id, *_FILE_OUT_COLUMNS, limit=limit)).mappings().all()
+    return serialize_new(rows, limit)
+
+
+def report(title: str, timings: dict) -> None:
+    print(title)
+    for name, samples in timings.items():
+        samples.sort()
+        median_ms = statistics.median(samples) * 1000
+        p95_ms = samples[int(len(samples) * 0.95) - 1] * 1000
+        print(f"  {name}: median {median_ms:.2f} ms, p95 {p95_ms:.2f} ms")
+    speedup = statistics.median(timings["old"]) / statistics.median(timings["new"])
+    print(f"  speedup: {speedup:.1f}x")
+
+
+async def measure(items: int, rounds: int) -> None:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    field = create_model_field("Response", schemas.FileListResponse)
+    with Session(engine) as session:
+        owner_id = seed(session, items)
+        entities = session.scalars(_page(owner_id, models.FileAsset, limit=items)).all()
+        rows = session.execute(_page(owner_id, *_FILE_OUT_COLUMNS, limit=items)).mappings().all()
+        assert await serialize_old(entities, items, field) == serialize_new(rows, items)
+
+        serialization = {"old": [], "new": []}
+        end_to_end = {"old": [], "new": []}
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await serialize_old(entities, items, field)
+            serialization["old"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            serialize_new(rows, items)
+            serialization["new"].append(time.perf_counter() - started)
+
+            for name, path in (("old", old_path), ("new", new_path)):
+                # Fresh identity map each time, as every request gets its own session
+                session.expunge_all()
+                started = time.perf_counter()
+                await path(session, owner_id, items, field)
+                end_to_end[name].append(time.perf_counter() - started)
+
+    report(f"{items}-item page, {rounds} rounds: serialization only", serialization)
+    report(f"{items}-item page, {rounds} rounds: query + serialization (SQLite)", end_to_end)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(measure(args.items, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Seed a large file_assets table and EXPLAIN ANALYZE the search queries against it.
+
+Run from the repository root against a disposable, migrated Postgres database:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.search_indexes --rows 1000000
+
+Seeded rows belong to `search-bench-*@example.com` users and are removed with `--cleanup`.
+"""
+
+import argparse
+import time
+from uuid import UUID
+
+from psycopg2.extras import register_uuid
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import schemas
+from database import SessionLocal
+from routers.files import _encode_cursor, _search_query
+
+EMAIL_PATTERN = "search-bench-%@example.com"
+
+SEED_USERS = text(
+    """
+    INSERT INTO users (id, email, hashed_password, created_at, updated_at)
+    SELECT gen_random_uuid(), 'search-bench-' || g || '@example.com', '-', now(), now()
+    FROM generate_series(1, :users) AS g
+    """
+)
+
+# One in five rows belongs to the first ("heavy") user; the rest are spread evenly
+SEED_FILES = text(
+    """
+    WITH bench AS (
+        SELECT array_agg(id ORDER BY email) AS ids FROM users WHERE email LIKE :pattern
+    )
+    INSERT INTO file_assets (
+        id, owner_id, display_name, stored_name, content_type, size, created_at, updated_at
+    )
+    SELECT
+        gen_random_uuid(),
+        CASE WHEN g % 5 = 0 THEN ids[1] ELSE ids[1 + g % array_length(ids, 1)] END,
+        (ARRAY['report', 'invoice', 'holiday', 'scan', 'draft', 'photo'])[1 + g % 6]
+            || '-' || g
+            || (ARRAY['.pdf', '.jpg', '.png', '.txt'])[1 + g % 4],
+        'search-bench/' || g,
+        (ARRAY['application/pdf', 'image/jpeg', 'image/png', 'text/plain'])[1 + g % 4],
+        (g::bigint * 7919) % 50000000,
+        now() - make_interval(secs => g),
+        now()
+    FROM bench, generate_series(1, :rows) AS g
+    """
+)
+
+
+def seed(db: Session, users: int, rows: int) -> None:
+    started = time.perf_counter()
+    db.execute(SEED_USERS, {"users": users})
+    db.execute(SEED_FILES, {"pattern": EMAIL_PATTERN, "rows": rows})
+    db.commit()
+    db.execute(text("ANALYZE users"))
+    db.execute(text("ANALYZE file_assets"))
+    db.commit()
+    print(f"Seeded {rows} files for {users} users in {time.perf_counter() - started:.1f}s")
+
+
+def cleanup(db: Session) -> None:
+    db.execute(
+        text(
+            "DELETE FROM file_assets WHERE owner_id IN "
+            "(SELECT id FROM users WHERE email LIKE :pattern)"
+        ),
+        {"pattern": EMAIL_PATTERN},
+    )
+    db.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": EMAIL_PATTERN})
+    db.commit()
+
+
+def heavy_user_id(db: Session) -> UUID:
+    return db.execute(
+        text("SELECT id FROM users WHERE email LIKE :pattern ORDER BY email LIMIT 1"),
+        {"pattern": EMAIL_PATTERN},
+    ).scalar_one()
+
+
+def explain(db: Session, label: str, owner_id: UUID, params: schemas.FileSearchParams) -> None:
+    """Print the plan and execution time of the exact query the endpoint runs."""
+    compiled = _search_query(db, owner_id, params).statement.compile(dialect=db.get_bind().dialect)
+    # Driver-level execution skips SQLAlchemy's bind processing, hence register_uuid() below
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS) {compiled}", compiled.params
+    ).scalars()
+    print(f"\n== {label}")
+    print("\n".join(plan))
+
+
+def run(db: Session) -> None:
+    owner_id = heavy_user_id(db)
+    first_page = _search_query(db, owner_id, schemas.FileSearchParams()).all()
+    cursor = _encode_cursor(first_page[9])
+    cases = {
+        "first page": schemas.FileSearchParams(),
+        "keyset page": schemas.FileSearchParams(cursor=cursor),
+        "name contains": schemas.FileSearchParams(q="voice-12"),
+        "name prefix": schemas.FileSearchParams(q="holiday-9", match="prefix"),
+        "content type family": schemas.FileSearchParams(content_type="image/*"),
+        "exact content type + size": schemas.FileSearchParams(
+            content_type="application/pdf", min_size=1_000_000, max_size=2_000_000
+        ),
+    }
+    for label, params in cases.items():
+        explain(db, label, owner_id, params)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse previously seeded rows")
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded rows and exit")
+    args = parser.parse_args()
+    register_uuid()
+
+    db = SessionLocal()
+    try:
+        if args.cleanup:
+            cleanup(db)
+            return
+        if not args.skip_seed:
+            cleanup(db)
+            seed(db, args.users, args.rows)
+        run(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -19,6 +19,51 @@ class Settings(BaseSettings):
 
     max_upload_size_bytes: int = Field(50 * 1024 * 1024, alias="MAX_UPLOAD_SIZE_BYTES")
 
+    upload_max_inflight: int = Field(8, alias="UPLOAD_MAX_INFLIGHT")
+    upload_max_inflight_bytes: int = Field(200 * 1024 * 1024, alias="UPLOAD_MAX_INFLIGHT_BYTES")
+    upload_max_inflight_per_user: int = Field(2, alias="UPLOAD_MAX_INFLIGHT_PER_USER")
+    upload_max_inflight_bytes_per_user: int = Field(
+        100 * 1024 * 1024, alias="UPLOAD_MAX_INFLIGHT_BYTES_PER_USER"
+    )
+    upload_retry_after_seconds: int = Field(5, alias="UPLOAD_RETRY_AFTER_SECONDS")
+
+    # Supabase signed upload URLs are valid for two hours; unfinalized objects go after this
+    presigned_upload_ttl_seconds: int = Field(3 * 60 * 60, alias="PRESIGNED_UPLOAD_TTL_SECONDS")
+    presigned_upload_max_pending: int = Field(20, alias="PRESIGNED_UPLOAD_MAX_PENDING")
+
+    thumbnail_max_pixels: int = Field(40_000_000, alias="THUMBNAIL_MAX_PIXELS")
+    thumbnail_timeout_seconds: float = Field(5.0, alias="THUMBNAIL_TIMEOUT_SECONDS")
+
+    storage_timeout_seconds: float = Field(10.0, alias="STORAGE_TIMEOUT_SECONDS")
+    storage_transfer_timeout_seconds: float = Field(120.0, alias="STORAGE_TRANSFER_TIMEOUT_SECONDS")
+    storage_retries: int = Field(2, alias="STORAGE_RETRIES")
+    storage_retry_backoff_seconds: float = Field(0.2, alias="STORAGE_RETRY_BACKOFF_SECONDS")
+    storage_hedge_after_seconds: float = Field(0.5, alias="STORAGE_HEDGE_AFTER_SECONDS")
+    storage_breaker_failure_threshold: int = Field(5, alias="STORAGE_BREAKER_FAILURE_THRESHOLD")
+    storage_breaker_reset_seconds: float = Field(30.0, alias="STORAGE_BREAKER_RESET_SECONDS")
+    storage_max_workers: int = Field(32, alias="STORAGE_MAX_WORKERS")
+
+    idempotency_key_ttl_seconds: int = Field(60 * 60 * 24, alias="IDEMPOTENCY_KEY_TTL_SECONDS")
+    idempotency_lock_seconds: int = Field(60 * 5, alias="IDEMPOTENCY_LOCK_SECONDS")
+    idempotency_wait_seconds: float = Field(30.0, alias="IDEMPOTENCY_WAIT_SECONDS")
+
+    access_log_enabled: bool = Field(True, alias="ACCESS_LOG_ENABLED")
+    # Share of fast, successful requests to log; errors and slow requests are always logged
+    access_log_sample_rate: float = Field(1.0, ge=0.0, le=1.0, alias="ACCESS_LOG_SAMPLE_RATE")
+    access_log_slow_ms: float = Field(1000.0, alias="ACCESS_LOG_SLOW_MS")
+
+    # "postgres" fans change-feed events out to every worker via LISTEN/NOTIFY
+    change_feed_backend: Literal["local", "postgres"] = Field(
+        "postgres", alias="CHANGE_FEED_BACKEND"
+    )
+    change_feed_backlog_size: int = Field(100, alias="CHANGE_FEED_BACKLOG_SIZE")
+    change_feed_max_users: int = Field(10_000, alias="CHANGE_FEED_MAX_USERS")
+    change_feed_queue_size: int = Field(100, alias="CHANGE_FEED_QUEUE_SIZE")
+    change_feed_heartbeat_seconds: float = Field(15.0, alias="CHANGE_FEED_HEARTBEAT_SECONDS")
+
+    housekeeping_interval_seconds: float = Field(300.0, alias="HOUSEKEEPING_INTERVAL_SECONDS")
+    housekeeping_batch_size: int = Field(500, alias="HOUSEKEEPING_BATCH_SIZE")
+
     allow_origins: List[str] = ["http://localhost:5173"]
 
     class Config:  # pylint: disable=too-few-public-methods
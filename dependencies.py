@@ -1,6 +1,7 @@
 from typing import Optional
+from uuid import UUID
 
-from fastapi import Cookie, Depends, HTTPException, status
+from fastapi import Cookie, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -49,3 +50,16 @@ def get_current_user(
     if user is None:
         raise _unauthorized("user_not_found", "User not found")
     return user
+
+
+def peek_user_id(request: Request) -> Optional[UUID]:
+    """Read the user id from a validly signed bearer token without checking the session.
+
+    Only for bookkeeping that runs before the route (e.g. per-user limits); routes must
+    still authenticate with `get_current_user`.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return security.decode_access_token(token).user_id
@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Protocol, Set
+from uuid import UUID
+
+import orjson
+from sqlalchemy import event as orm_event
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import engine
+from models import file_event_id_seq
+
+logger = logging.getLogger("uvicorn.error")
+
+NOTIFY_CHANNEL = "file_events"
+# Session.info key for events waiting on their session's commit
+_PENDING_EVENTS = "pending_file_events"
+
+
+@dataclass
+class FileEvent:
+    id: int
+    user_id: UUID
+    type: str
+    data: dict
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(
+            {"id": self.id, "user_id": self.user_id.hex, "type": self.type, "data": self.data}
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "FileEvent":
+        payload = orjson.loads(raw)
+        return cls(
+            id=payload["id"],
+            user_id=UUID(payload["user_id"]),
+            type=payload["type"],
+            data=payload["data"],
+        )
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {orjson.dumps(self.data).decode()}\n\n"
+
+
+def reset_sse(last_id: int) -> str:
+    # Carries the latest id seen so a later reconnect resumes from after the refetch
+    return f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+
+
+class Fanout(Protocol):
+    """Numbers published events and delivers them to the broker of every worker.
+
+    An event goes out only if the session it was published on commits. Events must reach
+    each broker in increasing id order, and `resync` is called whenever delivery (re)starts.
+    """
+
+    def publish(self, db: Session, user_id: UUID, event_type: str, data: dict) -> None: ...
+
+    def start(self, target: "ChangeBroker") -> None: ...
+
+    def stop(self) -> None: ...
+
+
+class LocalFanout:
+    """Single-process fan-out; enough for one worker or development."""
+
+    def __init__(self) -> None:
+        self._target: Optional["ChangeBroker"] = None
+        self._lock = threading.Lock()
+        # Seeded from the clock so ids keep increasing across restarts
+        self._last_id = time.time_ns()
+
+    def publish(self, db: Session, user_id: UUID, event_type: str, data: dict) -> None:
+        if self._target:
+            db.info.setdefault(_PENDING_EVENTS, []).append((user_id, event_type, data))
+
+    def _deliver(self, db: Session) -> None:
+        pending = db.info.pop(_PENDING_EVENTS, ())
+        # Numbering and delivery under one lock keep concurrent sessions in id order
+        with self._lock:
+            for user_id, event_type, data in pending:
+                self._last_id += 1
+                if self._target:
+                    self._target.dispatch(FileEvent(self._last_id, user_id, event_type, data))
+
+    @staticmethod
+    def _discard(db: Session) -> None:
+        db.info.pop(_PENDING_EVENTS, None)
+
+    def start(self, target: "ChangeBroker") -> None:
+        with self._lock:
+            self._target = target
+            target.resync(self._last_id)
+        orm_event.listen(Session, "after_commit", self._deliver)
+        orm_event.listen(Session, "after_rollback", self._discard)
+
+    def stop(self) -> None:
+        orm_event.remove(Session, "after_commit", self._deliver)
+        orm_event.remove(Session, "after_rollback", self._discard)
+        self._target = None
+
+
+class PostgresNotifyFanout:
+    """Cross-worker fan-out over Postgres `NOTIFY`, with a `LISTEN` thread per worker."""
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL) -> None:
+        self._channel = channel
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, db: Session, user_id: UUID, event_type: str, data: dict) -> None:
+        # In the caller's transaction: Postgres delivers the NOTIFY only if the change commits.
+        # The lock is held until that commit, so ids are taken and notified in commit order
+        # and every listener receives them in increasing order
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:channel))"), {"channel": self._channel}
+        )
+        event_id = db.scalar(file_event_id_seq.next_value())
+        event = FileEvent(event_id, user_id, event_type, data)
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self._channel, "payload": event.to_json().decode("utf-8")},
+        )
+
+    def start(self, target: "ChangeBroker") -> None:
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._listen_forever, args=(target,), name="file-events-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen_forever(self, target: "ChangeBroker") -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen(target)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Change feed listener failed; reconnecting", exc_info=True)
+                self._stopping.wait(1)
+
+    def _listen(self, target: "ChangeBroker") -> None:
+        # A dedicated connection: detached so it never counts against the request pool
+        connection = engine.raw_connection()
+        connection.detach()
+        driver_connection = connection.driver_connection
+        try:
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self._channel}"')
+                # Anything numbered after this is committed later, so it reaches this listener
+                cursor.execute(
+                    "SELECT CASE WHEN is_called THEN last_value ELSE 0 END "
+                    f"FROM {file_event_id_seq.name}"
+                )
+                target.resync(cursor.fetchone()[0])
+            while not self._stopping.is_set():
+                readable, _, _ = select.select([driver_connection], [], [], 1.0)
+                if not readable:
+                    continue
+                driver_connection.poll()
+                while driver_connection.notifies:
+                    notify = driver_connection.notifies.pop(0)
+                    target.dispatch(FileEvent.from_json(notify.payload))
+        finally:
+            connection.close()
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: UUID
+    queue: "asyncio.Queue[FileEvent]"
+    backlog: List[FileEvent] = field(default_factory=list)
+    # Set when events may have been missed; the client should refetch its listing
+    needs_reset: bool = False
+
+
+class ChangeBroker:  # pylint: disable=too-many-instance-attributes
+    """Per-user, in-process pub/sub with a bounded replay buffer for `Last-Event-ID`."""
+
+    def __init__(self, fanout: Fanout, backlog_size: int, max_users: int) -> None:
+        self._fanout = fanout
+        self._backlog_size = backlog_size
+        self._max_users = max_users
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._subscribers: Dict[UUID, Set[Subscription]] = {}
+        self._backlogs: "OrderedDict[UUID, Deque[FileEvent]]" = OrderedDict()
+        # Per user: every event with a higher id is still in the backlog
+        self._complete_since: Dict[UUID, int] = {}
+        # Every event with a higher id reaches this worker; unknown until the fanout resyncs
+        self._delivered_after: Optional[int] = None
+        self._evicted_up_to = 0
+        self._last_id = 0
+        self._counters = {"published": 0, "dispatched": 0, "overflows": 0}
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._fanout.start(self)
+
+    def stop(self) -> None:
+        self._fanout.stop()
+        self._loop = None
+
+    def publish(self, db: Session, user_id: UUID, event_type: str, data: dict) -> None:
+        """Send an event with the session's next commit; nothing is sent if it rolls back.
+
+        Call it before `db.commit()`. A failure here fails the change rather than silently
+        dropping its event.
+        """
+        self._fanout.publish(db, user_id, event_type, data)
+        with self._lock:
+            self._counters["published"] += 1
+
+    def resync(self, delivered_after: int) -> None:
+        """Start over after the fanout (re)connects; events before it may have been missed."""
+        with self._lock:
+            self._delivered_after = delivered_after
+            self._last_id = max(self._last_id, delivered_after)
+            self._backlogs.clear()
+            self._complete_since.clear()
+            subscriptions = [sub for subs in self._subscribers.values() for sub in subs]
+        for subscription in subscriptions:
+            subscription.needs_reset = True
+
+    def last_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    def dispatch(self, event: FileEvent) -> None:
+        with self._lock:
+            self._counters["dispatched"] += 1
+            self._last_id = max(self._last_id, event.id)
+            self._remember(event)
+            subscriptions = list(self._subscribers.get(event.user_id, ()))
+        if self._loop and subscriptions:
+            for subscription in subscriptions:
+                self._loop.call_soon_threadsafe(self._offer, subscription, event)
+
+    def _remember(self, event: FileEvent) -> None:
+        backlog = self._backlogs.get(event.user_id)
+        if backlog is None:
+            backlog = self._backlogs[event.user_id] = deque()
+            self._complete_since[event.user_id] = self._default_complete_since()
+        self._backlogs.move_to_end(event.user_id)
+        if len(backlog) >= self._backlog_size:
+            self._complete_since[event.user_id] = backlog.popleft().id
+        backlog.append(event)
+        while len(self._backlogs) > self._max_users:
+            evicted_user, evicted = self._backlogs.popitem(last=False)
+            self._complete_since.pop(evicted_user, None)
+            self._evicted_up_to = max(self._evicted_up_to, evicted[-1].id)
+
+    def _default_complete_since(self) -> int:
+        # Nothing before the last resync survives, nor anything from users evicted since
+        return max(self._delivered_after or 0, self._evicted_up_to)
+
+    def _offer(self, subscription: Subscription, event: FileEvent) -> None:
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client gets a reset instead of an ever-growing queue
+            with self._lock:
+                self._counters["overflows"] += 1
+            subscription.needs_reset = True
+
+    def subscribe(self, user_id: UUID, last_event_id: Optional[int]) -> Subscription:
+        subscription = Subscription(
+            user_id=user_id, queue=asyncio.Queue(maxsize=settings.change_feed_queue_size)
+        )
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            if last_event_id is not None:
+                complete_since = self._complete_since.get(
+                    user_id, self._default_complete_since()
+                )
+                if self._delivered_after is None or last_event_id < complete_since:
+                    subscription.needs_reset = True
+                else:
+                    subscription.backlog = [
+                        event
+                        for event in self._backlogs.get(user_id, ())
+                        if event.id > last_event_id
+                    ]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+                "users_with_backlog": len(self._backlogs),
+                **self._counters,
+            }
+
+
+def _build_fanout() -> Fanout:
+    if settings.change_feed_backend == "postgres":
+        return PostgresNotifyFanout()
+    return LocalFanout()
+
+
+broker = ChangeBroker(
+    _build_fanout(),
+    backlog_size=settings.change_feed_backlog_size,
+    max_users=settings.change_feed_max_users,
+)
@@ -0,0 +1,35 @@
+import os
+
+# Gunicorn settings for production: `gunicorn -c gunicorn.conf.py main:app`
+
+
+def _available_cores() -> int:
+    # Respect CPU affinity (containers, taskset) rather than the host's core count
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", _available_cores()))
+worker_class = "uvicorn_worker.UvicornWorker"
+# Import the app (FastAPI, SQLAlchemy, supabase, Pillow) once in the master and fork from it
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    import warmup  # pylint: disable=import-outside-toplevel
+
+    warmup.preload_codecs()
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    import warmup  # pylint: disable=import-outside-toplevel
+    from database import engine  # pylint: disable=import-outside-toplevel
+
+    # Never share pooled connections inherited from the master across processes
+    engine.dispose(close=False)
+    warmup.mark_process_start()
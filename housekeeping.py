@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+import models
+import storage
+from config import settings
+from database import SessionLocal
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def purge_expired_uploads() -> int:
+    """Remove objects whose signed upload was never finalized; returns rows purged."""
+    db = SessionLocal()
+    purged = 0
+    try:
+        expired = (
+            db.query(models.PendingUpload)
+            .filter(models.PendingUpload.expires_at <= datetime.now(timezone.utc))
+            .order_by(models.PendingUpload.expires_at)
+            .limit(settings.housekeeping_batch_size)
+            # Every worker runs this job; skipped rows are being finalized or purged elsewhere
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for pending in expired:
+            try:
+                storage.delete_file(Path(pending.owner_id.hex), pending.stored_name)
+            except HTTPException:
+                # Keep the row so the object is retried on the next run
+                logger.warning("Could not purge unfinalized upload %s", pending.stored_name)
+                continue
+            db.delete(pending)
+            purged += 1
+        db.commit()
+    finally:
+        db.close()
+    return purged
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Delete one batch of expired idempotency keys; returns rows deleted."""
+    db = SessionLocal()
+    try:
+        expired = (
+            select(models.IdempotencyKey.id)
+            .where(models.IdempotencyKey.expires_at <= datetime.now(timezone.utc))
+            .limit(settings.housekeeping_batch_size)
+        )
+        deleted = (
+            db.query(models.IdempotencyKey)
+            .filter(models.IdempotencyKey.id.in_(expired.scalar_subquery()))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+    return deleted
+
+
+JOBS: List[Callable[[], int]] = [purge_expired_uploads, purge_expired_idempotency_keys]
+
+
+async def run_housekeeping() -> None:
+    """Run each job every `housekeeping_interval_seconds` until cancelled."""
+    # Stagger workers so they do not all start the same batch at once
+    await asyncio.sleep(random.uniform(0, settings.housekeeping_interval_seconds))
+    while True:
+        for job in JOBS:
+            try:
+                removed = await run_in_threadpool(job)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Housekeeping job %s failed", job.__name__, exc_info=True)
+            else:
+                if removed:
+                    logger.info("Housekeeping job %s removed %d rows", job.__name__, removed)
+        await asyncio.sleep(settings.housekeeping_interval_seconds)
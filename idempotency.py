@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import models
+from config import settings
+from database import SessionLocal
+from dependencies import get_current_user
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+_FILE_ROUTE = re.compile(r"^/files/[0-9a-fA-F-]{32,36}$")
+_POLL_INTERVAL_SECONDS = 0.25
+# Recomputed from the body when a stored response is rebuilt
+_UNSTORED_HEADERS = {"content-length"}
+# Request state key for the filename read from an idempotent upload's first part
+UPLOAD_FILENAME_STATE = "upload_filename"
+# How much of an upload body is read looking for the first part's headers
+_UPLOAD_HEAD_LIMIT = 16 * 1024
+_PART_FILENAME = re.compile(rb'filename="((?:[^"\\]|\\.)*)"')
+
+
+class _StoredResponse(NamedTuple):
+    status_code: int
+    body: bytes
+    content_type: Optional[str]
+    # None for responses stored before headers were kept
+    headers: Optional[List[Tuple[str, str]]]
+
+
+def _is_covered(method: str, path: str) -> bool:
+    if method == "POST":
+        return path == "/files/upload"
+    return method in {"PUT", "DELETE"} and bool(_FILE_ROUTE.match(path))
+
+
+def _authenticated_user_id(request: Request) -> Optional[UUID]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    db = SessionLocal()
+    try:
+        user = get_current_user(
+            token=token if scheme.lower() == "bearer" else "",
+            access_token_cookie=request.cookies.get("access_token"),
+            db=db,
+        )
+        return user.id
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+
+def _claim(
+    user_id: UUID, key: str, method: str, path: str, fingerprint: Optional[str]
+) -> Tuple[str, Optional[_StoredResponse]]:
+    """Reserve the key for this request; returns (outcome, stored response to replay).
+
+    Outcomes: "claimed", "busy" (another request holds it), "mismatch", "replay".
+    """
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.expires_at <= now,
+        ).delete(synchronize_session=False)
+        record = (
+            db.query(models.IdempotencyKey)
+            .filter(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key)
+            .first()
+        )
+        if record is None:
+            # In-progress reservations expire after the lock timeout in case the worker dies
+            db.add(
+                models.IdempotencyKey(
+                    user_id=user_id,
+                    key=key,
+                    request_method=method,
+                    request_path=path,
+                    request_hash=fingerprint,
+                    expires_at=now + timedelta(seconds=settings.idempotency_lock_seconds),
+                )
+            )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return "busy", None
+            return "claimed", None
+        db.commit()
+
+        if (record.request_method, record.request_path) != (method, path) or (
+            # Keys stored before requests were fingerprinted match on method and path only
+            record.request_hash is not None
+            and record.request_hash != fingerprint
+        ):
+            return "mismatch", None
+        if record.status_code is None:
+            return "busy", None
+        return "replay", _StoredResponse(
+            record.status_code,
+            record.response_body or b"",
+            record.response_content_type,
+            [tuple(header) for header in record.response_headers]
+            if record.response_headers is not None
+            else None,
+        )
+    finally:
+        db.close()
+
+
+def _complete(user_id: UUID, key: str, response: _StoredResponse) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key
+        ).update(
+            {
+                models.IdempotencyKey.status_code: response.status_code,
+                models.IdempotencyKey.response_body: response.body,
+                models.IdempotencyKey.response_content_type: response.content_type,
+                models.IdempotencyKey.response_headers: response.headers,
+                models.IdempotencyKey.expires_at: datetime.now(timezone.utc)
+                + timedelta(seconds=settings.idempotency_key_ttl_seconds),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(user_id: UUID, key: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.status_code.is_(None),
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _route_ran(request: Request, response: Response) -> bool:
+    """Whether the response came from the route rather than from a middleware or the router.
+
+    Admission control's 429 and 503 (and server errors) say nothing about the request itself,
+    so the key is released for those and a retry runs the request normally.
+    """
+    if response.status_code >= 500 or response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+        return False
+    # The router adds the matched endpoint to the shared ASGI scope
+    return "endpoint" in request.scope
+
+
+def _rebuild(stored: _StoredResponse) -> Response:
+    if stored.headers is None:
+        return Response(
+            content=stored.body, status_code=stored.status_code, media_type=stored.content_type
+        )
+    response = Response(content=stored.body, status_code=stored.status_code)
+    for name, value in stored.headers:
+        response.headers.append(name, value)
+    return response
+
+
+async def _wait_for_claim(
+    user_id: UUID, key: str, method: str, path: str, fingerprint: Optional[str]
+) -> Optional[Response]:
+    """Claim the key, waiting while another request holds it.
+
+    Returns the response to send instead of running the request, or None once claimed.
+    """
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    while True:
+        outcome, stored = await run_in_threadpool(
+            _claim, user_id, key, method, path, fingerprint
+        )
+        if outcome != "busy":
+            break
+        if time.monotonic() >= deadline:
+            return _error(
+                status.HTTP_409_CONFLICT,
+                "idempotency_key_in_progress",
+                "A request with this Idempotency-Key is still being processed",
+            )
+        await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+
+    if outcome == "mismatch":
+        return _error(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "idempotency_key_reused",
+            "Idempotency-Key was already used for a different request",
+        )
+    if outcome == "replay" and stored:
+        replayed = _rebuild(stored)
+        replayed.headers["Idempotent-Replayed"] = "true"
+        return replayed
+    return None
+
+
+async def _fingerprint(request: Request) -> Optional[str]:
+    """Hash of what the request asks for, so a key reused for a different request is refused.
+
+    Renames hash the JSON body; uploads hash the filename and Content-Length rather than the
+    payload, which has not been received yet. Deletes are fully described by their path.
+    """
+    if request.method == "PUT":
+        # Starlette caches the body and hands it on to the route
+        return hashlib.sha256(await request.body()).hexdigest()
+    if request.method == "POST":
+        filename = getattr(request.state, UPLOAD_FILENAME_STATE, None) or b""
+        content_length = request.headers.get("content-length", "").encode("latin-1")
+        return hashlib.sha256(filename + b"\n" + content_length).hexdigest()
+    return None
+
+
+def _error(status_code: int, code: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code, content={"detail": {"code": code, "message": message}}
+    )
+
+
+async def handle_idempotency_key(request: Request, call_next):
+    """Replay the stored response for a repeated `Idempotency-Key` on file mutations.
+
+    Runs before an upload's payload is read (only the first part's headers are, by
+    `UploadFilenameReader`), so a retried upload is answered without the payload being
+    received again. A key reused for a different request is refused. Concurrent requests
+    with the same key wait for the first one to finish.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or not _is_covered(request.method, request.url.path):
+        return await call_next(request)
+    if len(key) > 255:
+        return _error(
+            status.HTTP_400_BAD_REQUEST, "invalid_idempotency_key", "Idempotency-Key is too long"
+        )
+
+    user_id = await run_in_threadpool(_authenticated_user_id, request)
+    if user_id is None:
+        # Let the route produce its usual authentication error
+        return await call_next(request)
+
+    answer = await _wait_for_claim(
+        user_id, key, request.method, request.url.path, await _fingerprint(request)
+    )
+    if answer is not None:
+        return answer
+
+    try:
+        response = await call_next(request)
+        if not _route_ran(request, response):
+            await run_in_threadpool(_release, user_id, key)
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+    except BaseException:
+        await run_in_threadpool(_release, user_id, key)
+        raise
+    stored = _StoredResponse(
+        response.status_code,
+        body,
+        response.headers.get("content-type"),
+        [
+            (name, value)
+            for name, value in response.headers.items()
+            if name not in _UNSTORED_HEADERS
+        ],
+    )
+    await run_in_threadpool(_complete, user_id, key, stored)
+    return _rebuild(stored)
+
+
+class UploadFilenameReader:
+    """Reads the filename of an idempotent upload's first part for its fingerprint.
+
+    The filename only appears in the multipart body, which a function middleware cannot
+    peek at and put back, so this reads up to the end of the first part's headers and
+    replays those messages to the rest of the app unchanged.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != "/files/upload"
+            or not any(name == IDEMPOTENCY_HEADER.encode() for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        buffered: List[Message] = []
+        head = b""
+        while len(head) < _UPLOAD_HEAD_LIMIT and b"\r\n\r\n" not in head:
+            message = await receive()
+            buffered.append(message)
+            if message["type"] != "http.request":
+                break
+            head += message.get("body", b"")[: _UPLOAD_HEAD_LIMIT - len(head)]
+            if not message.get("more_body", False):
+                break
+        match = _PART_FILENAME.search(head.split(b"\r\n\r\n", 1)[0])
+        scope.setdefault("state", {})[UPLOAD_FILENAME_STATE] = match[1] if match else None
+
+        async def replay() -> Message:
+            if buffered:
+                return buffered.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
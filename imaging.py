@@ -0,0 +1,142 @@
+import base64
+import io
+import logging
+import multiprocessing
+import os
+from io import BytesIO
+from multiprocessing import forkserver, reduction
+from multiprocessing.connection import Connection
+from typing import BinaryIO, NamedTuple, Optional
+
+from PIL import Image
+
+from config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+THUMBNAIL_WIDTH = 64
+PLACEHOLDER_MAX_SIZE = 16
+_PNG_MODES = {"1", "L", "LA", "I", "P", "RGB", "RGBA"}
+
+# Renderers fork from a server that has already imported Pillow, so each render starts fast
+_render_context = multiprocessing.get_context("forkserver")
+_render_context.set_forkserver_preload([__name__])
+
+
+class ImageDerivatives(NamedTuple):
+    thumbnail: bytes
+    width: int
+    height: int
+    placeholder: str
+
+
+def _build_placeholder(thumb: Image.Image) -> str:
+    """Encode a ~100 byte preview as a WebP data URI; clients upscale it with a blur."""
+    small = thumb.convert("RGBA" if "A" in thumb.getbands() else "RGB")
+    small.thumbnail((PLACEHOLDER_MAX_SIZE, PLACEHOLDER_MAX_SIZE))
+    buf = BytesIO()
+    small.save(buf, format="WEBP", quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _render(source: BinaryIO, max_pixels: int) -> ImageDerivatives:
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source) as image:
+        width, height = image.size
+        # Animated GIF/WebP/APNG: only the first frame is ever decoded
+        image.seek(0)
+        new_height = max(1, int(height * THUMBNAIL_WIDTH / float(width)))
+        # thumbnail() drafts first, so JPEGs are decoded at a reduced scale
+        image.thumbnail((THUMBNAIL_WIDTH, new_height))
+        thumb = image if image.mode in _PNG_MODES else image.convert("RGB")
+        buf = BytesIO()
+        thumb.save(buf, format="PNG")
+        return ImageDerivatives(
+            thumbnail=buf.getvalue(),
+            width=width,
+            height=height,
+            placeholder=_build_placeholder(thumb),
+        )
+
+
+def _render_worker(conn: Connection, data: Optional[bytes], max_pixels: int) -> None:
+    try:
+        if data is None:
+            # The parent sent a descriptor of its (spooled) file rather than the bytes
+            with os.fdopen(reduction.recv_handle(conn), "rb") as source:
+                source.seek(0)
+                conn.send(_render(source, max_pixels))
+        else:
+            conn.send(_render(BytesIO(data), max_pixels))
+    except Exception as exc:  # pylint: disable=broad-except
+        conn.send(repr(exc))
+    finally:
+        conn.close()
+
+
+def _file_descriptor(source: BinaryIO) -> Optional[int]:
+    try:
+        return source.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return None
+
+
+def _render_with_time_limit(source: BinaryIO) -> Optional[ImageDerivatives]:
+    # A socket pair, so the file descriptor can be passed to the renderer
+    receiver, sender = _render_context.Pipe(duplex=True)
+    fd = _file_descriptor(source)
+    # Files on disk are shared by descriptor so the parent never holds the whole image;
+    # in-memory sources (downloads) are copied to the renderer
+    data = None if fd is not None else source.read()
+    process = _render_context.Process(
+        target=_render_worker, args=(sender, data, settings.thumbnail_max_pixels), daemon=True
+    )
+    process.start()
+    sender.close()
+    try:
+        if fd is not None:
+            reduction.send_handle(receiver, fd, process.pid)
+        if not receiver.poll(settings.thumbnail_timeout_seconds):
+            logger.warning(
+                "Thumbnail rendering exceeded %ss; skipped", settings.thumbnail_timeout_seconds
+            )
+            return None
+        result = receiver.recv()
+    except (EOFError, OSError):
+        # The renderer died without answering (e.g. killed for memory)
+        logger.warning("Thumbnail renderer exited with code %s", process.exitcode)
+        return None
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+    if isinstance(result, str):
+        logger.warning("Could not render thumbnail: %s", result)
+        return None
+    return result
+
+
+def start_render_server() -> None:
+    """Start the fork server ahead of the first upload."""
+    forkserver.ensure_running()
+
+
+def render_derivatives(source: BinaryIO) -> Optional[ImageDerivatives]:
+    """Derive thumbnail, dimensions and placeholder within the pixel and time budget.
+
+    Dimensions are read from the header without decoding; images over
+    `thumbnail_max_pixels` are skipped, and decoding runs in a separate process that is
+    killed after `thumbnail_timeout_seconds`. Returns None when no thumbnail can be made.
+    """
+    try:
+        with Image.open(source) as image:
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError) as exc:
+        logger.warning("Could not read image header: %r", exc)
+        return None
+    if width == 0 or height == 0 or width * height > settings.thumbnail_max_pixels:
+        return None
+
+    source.seek(0)
+    return _render_with_time_limit(source)
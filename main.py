@@ -1,11 +1,20 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+import housekeeping
+import warmup
+from access_log import log_access, start_access_log, stop_access_log
+from admission import admit_uploads
 from config import settings
+from events import broker
+from idempotency import UploadFilenameReader, handle_idempotency_key
 from routers import auth, files, health
 
 logger = logging.getLogger("uvicorn.error")
@@ -29,9 +38,27 @@ async def _handle_unexpected_exception(request: Request, exc: Exception) -> JSON
     )
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if settings.access_log_enabled:
+        start_access_log()
+    # Warm up after startup so the worker already answers probes; /healthz reports
+    # `warming_up` until it finishes
+    warmup_task = asyncio.create_task(run_in_threadpool(warmup.warm_up))
+    broker.start(asyncio.get_running_loop())
+    housekeeping_task = asyncio.create_task(housekeeping.run_housekeeping())
+    yield
+    housekeeping_task.cancel()
+    broker.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+    stop_access_log()
+
+
 def create_app() -> FastAPI:
     fast_api_app = FastAPI(
         title="File Manager API",
+        lifespan=lifespan,
         docs_url="/docs" if settings.is_debug else None,
         redoc_url="/redoc" if settings.is_debug else None,
         openapi_url="/openapi.json" if settings.is_debug else None,
@@ -44,6 +71,14 @@ def create_app() -> FastAPI:
         except Exception as exc:  # pylint: disable=broad-except
             return await _handle_unexpected_exception(request, exc)
 
+    fast_api_app.middleware("http")(admit_uploads)
+    # Registered after admission control so replays never consume upload capacity
+    fast_api_app.middleware("http")(handle_idempotency_key)
+    # Outside the idempotency check, which fingerprints uploads by the filename it reads
+    fast_api_app.add_middleware(UploadFilenameReader)
+    if settings.access_log_enabled:
+        fast_api_app.middleware("http")(log_access)
+
     fast_api_app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allow_origins,
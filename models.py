@@ -2,26 +2,39 @@ import uuid
 from datetime import datetime, timezone
 from typing import List, Optional
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, String
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    Sequence,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class IdTimestampedEntity:
     __abstract__ = True
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
     )
-    created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.now(timezone.utc), nullable=False
-    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=_utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+        default=_utcnow,
+        onupdate=_utcnow,
         nullable=False,
     )
 
@@ -45,13 +58,30 @@ class User(IdTimestampedEntity, Base):
 
 class FileAsset(IdTimestampedEntity, Base):
     __tablename__ = "file_assets"
-    __table_args__ = (Index("ix_file_assets_owner_id_created_at", "owner_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_file_assets_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index(
+            "ix_file_assets_owner_id_content_type_created_at",
+            "owner_id",
+            "content_type",
+            "created_at",
+        ),
+        Index(
+            "ix_file_assets_display_name_trgm",
+            "display_name",
+            postgresql_using="gin",
+            postgresql_ops={"display_name": "gin_trgm_ops"},
+        ),
+    )
 
     display_name: Mapped[str] = mapped_column(String(500), nullable=False)
     stored_name: Mapped[str] = mapped_column(String(537), nullable=False, unique=True)
     thumbnail_name: Mapped[Optional[str]] = mapped_column(String(600), nullable=True)
-    content_type: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    content_type: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    placeholder: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
 
     owner_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -73,3 +103,42 @@ class UserSession(IdTimestampedEntity, Base):
     deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     user: Mapped["User"] = relationship("User", back_populates="sessions")
+
+
+class IdempotencyKey(IdTimestampedEntity, Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),)
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False
+    )
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    request_method: Mapped[str] = mapped_column(String(8), nullable=False)
+    request_path: Mapped[str] = mapped_column(String(255), nullable=False)
+    # SHA-256 of the request's body or upload filename; null for keys stored before it was kept
+    request_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    # Null while the first request is still running
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    response_body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    response_content_type: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # [name, value] pairs, replayed as-is apart from Content-Length
+    response_headers: Mapped[Optional[List[List[str]]]] = mapped_column(JSON, nullable=True)
+
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+class PendingUpload(IdTimestampedEntity, Base):
+    """An object key handed out for a direct upload that has not been finalized yet."""
+
+    __tablename__ = "pending_uploads"
+
+    owner_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True
+    )
+    stored_name: Mapped[str] = mapped_column(String(537), nullable=False, unique=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
+# Change feed event ids, shared by every worker so they order events across processes
+file_event_id_seq = Sequence("file_event_id_seq", metadata=Base.metadata)
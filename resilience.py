@@ -0,0 +1,184 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CallTimeoutError(TimeoutError):
+    pass
+
+
+def _ensure_off_event_loop() -> None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    # Waiting here would stall every request on the worker for up to the call's timeout
+    raise RuntimeError("Blocking call made on the event loop; run it in the threadpool instead")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Timeouts, transport failures and 5xx answers; client errors (4xx) are not retried."""
+    if isinstance(exc, (TimeoutError, httpx.TransportError)):
+        return True
+    try:
+        return int(getattr(exc, "status", 0)) >= 500
+    except (TypeError, ValueError):
+        return False
+
+
+@dataclass
+class CircuitBreaker:
+    """Opens after consecutive transient failures; lets one trial call through after a pause."""
+
+    failure_threshold: int
+    reset_timeout: float
+    _state: str = "closed"
+    _failures: int = 0
+    _opened_at: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError()
+                self._state = "half_open"
+            elif self._state == "half_open":
+                # A trial call is already in flight
+                raise CircuitOpenError()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return self._state
+
+
+@dataclass
+class ResilientCaller:
+    """Runs blocking client calls with timeouts, jittered retries, hedging and a breaker."""
+
+    breaker: CircuitBreaker
+    max_workers: int
+    retry_backoff: float
+    _executor: Optional[ThreadPoolExecutor] = None
+    _counters: Dict[str, int] = field(
+        default_factory=lambda: {
+            "calls": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "retries": 0,
+            "hedges": 0,
+            "short_circuited": 0,
+        }
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _submit(self, fn: Callable[[], T]) -> "Future[T]":
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="resilient-call"
+                )
+            executor = self._executor
+        return executor.submit(fn)
+
+    def _attempt(self, fn: Callable[[], T], timeout: float, hedge_after: Optional[float]) -> T:
+        deadline = time.monotonic() + timeout
+        pending = {self._submit(fn)}
+        if hedge_after is not None and hedge_after < timeout:
+            done, pending = wait(pending, timeout=hedge_after)
+            if not done:
+                # The first request is slow; race a duplicate and take whichever answers first
+                self._count("hedges")
+                pending.add(self._submit(fn))
+            else:
+                pending = done
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        self._count("timeouts")
+        raise CallTimeoutError(f"call did not finish within {timeout}s")
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        *,
+        timeout: float,
+        retries: int = 0,
+        hedge_after: Optional[float] = None,
+    ) -> T:
+        """Call `fn`; only pass `retries`/`hedge_after` for idempotent operations.
+
+        Blocks until the call finishes or times out, so it must not run on the event loop.
+        """
+        _ensure_off_event_loop()
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("short_circuited")
+                raise
+            self._count("calls")
+            try:
+                result = self._attempt(fn, timeout, hedge_after)
+            except Exception as exc:  # pylint: disable=broad-except
+                if not is_transient(exc):
+                    # A client error still proves the backend is answering
+                    self.breaker.record_success()
+                    raise
+                self._count("failures")
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                self._count("retries")
+                # Full jitter: sleep a random share of the exponential backoff
+                time.sleep(random.uniform(0, self.retry_backoff * 2**attempt))
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"circuit": self.breaker.state, **counters}
@@ -1,47 +1,111 @@
-from datetime import datetime, timezone
+import asyncio
+import base64
+import binascii
+import hashlib
+from datetime import datetime, timedelta, timezone
 from enum import IntEnum
 from pathlib import Path
-from typing import Optional
+from typing import Annotated, List, Optional, Tuple
 from urllib.parse import quote
 from uuid import UUID
 
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
+    Header,
     HTTPException,
     Query,
+    Request,
     Response,
     UploadFile,
     status,
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session
 
+import events
 import models
 import schemas
 import storage
 from config import settings
-from database import get_db
+from database import SessionLocal, get_db
 from dependencies import get_current_user
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
+# Only the columns FileOut exposes, so list pages skip ORM entity construction
+_FILE_OUT_COLUMNS = tuple(
+    getattr(models.FileAsset, name) for name in schemas.FileOut.model_fields.keys()
+)
+
+
+_CONTENT_TYPE_MAX_LENGTH = models.FileAsset.content_type.type.length
+
+
 class StorageAccessExpireTime(IntEnum):
     FILE = 60 * 60 * 12
     THUMBNAIL = 60 * 60
 
 
+def _weak_etag(*parts: object) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore the W/ prefix on both sides
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+def _publish_change(db: Session, event_type: str, asset: models.FileAsset) -> None:
+    """Queue the change event on the session; call before `db.commit()`."""
+    # Flushing fills in the generated id and timestamps the event carries
+    db.flush()
+    events.broker.publish(
+        db,
+        asset.owner_id,
+        event_type,
+        schemas.FileOut.model_validate(asset).model_dump(mode="json"),
+    )
+
+
+def _fit_content_type(content_type: Optional[str]) -> Optional[str]:
+    # Anything longer is not a real media type; store none rather than fail the insert
+    if content_type and len(content_type) <= _CONTENT_TYPE_MAX_LENGTH:
+        return content_type
+    return None
+
+
+def _file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="File too large; max 50MB",
+    )
+
+
 @router.post("/upload", response_model=schemas.FileOut, status_code=status.HTTP_201_CREATED)
-async def upload_file(
+def upload_file(
     file: UploadFile,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    stored_name, thumbnail_name = storage.save_upload_file(
-        file,
-        Path(current_user.id.hex),
-    )
     if not file.size:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,57 +113,347 @@ async def upload_file(
         )
 
     if file.size > settings.max_upload_size_bytes:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large; max 50MB",
-        )
+        raise _file_too_large()
+
+    stored_name, image = storage.save_upload_file(
+        file,
+        Path(current_user.id.hex),
+    )
 
     asset = models.FileAsset(
         display_name=file.filename,
         stored_name=stored_name,
-        thumbnail_name=thumbnail_name,
-        content_type=file.content_type,
+        thumbnail_name=image.thumbnail_name if image else None,
+        width=image.width if image else None,
+        height=image.height if image else None,
+        placeholder=image.placeholder if image else None,
+        content_type=_fit_content_type(file.content_type),
         size=file.size,
         owner_id=current_user.id,
     )
     db.add(asset)
+    _publish_change(db, "file.created", asset)
+    db.commit()
+    db.refresh(asset)
+    return asset
+
+
+@router.post("/presigned-upload", response_model=schemas.UploadUrlOut)
+def create_presigned_upload(
+    payload: schemas.UploadUrlRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if payload.size > settings.max_upload_size_bytes:
+        raise _file_too_large()
+    now = datetime.now(timezone.utc)
+    pending_count = (
+        db.query(func.count(models.PendingUpload.id))
+        .filter(
+            models.PendingUpload.owner_id == current_user.id,
+            models.PendingUpload.expires_at > now,
+        )
+        .scalar()
+    )
+    if pending_count >= settings.presigned_upload_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many unfinished uploads; finalize or wait for them to expire",
+        )
+    stored_name, upload_url, token = storage.create_upload_url(
+        payload.filename, Path(current_user.id.hex)
+    )
+    # Recorded so the object is removed if the upload is never finalized
+    db.add(
+        models.PendingUpload(
+            owner_id=current_user.id,
+            stored_name=stored_name,
+            expires_at=now + timedelta(seconds=settings.presigned_upload_ttl_seconds),
+        )
+    )
+    db.commit()
+    return schemas.UploadUrlOut(stored_name=stored_name, upload_url=upload_url, token=token)
+
+
+def _attach_thumbnail(file_id: UUID, storage_dir: Path, stored_name: str) -> None:
+    image = storage.create_thumbnail_from_object(storage_dir, stored_name)
+    if not image:
+        return
+    db = SessionLocal()
+    try:
+        asset = db.get(models.FileAsset, file_id)
+        if asset:
+            asset.thumbnail_name = image.thumbnail_name
+            asset.width = image.width
+            asset.height = image.height
+            asset.placeholder = image.placeholder
+            _publish_change(db, "file.updated", asset)
+            db.commit()
+    finally:
+        db.close()
+
+
+@router.post(
+    "/presigned-upload/finalize",
+    response_model=schemas.FileOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def finalize_presigned_upload(
+    payload: schemas.UploadFinalize,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    storage_dir = Path(current_user.id.hex)
+    if not storage.is_valid_stored_name(payload.stored_name):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid stored name")
+    existing = (
+        db.query(models.FileAsset.id)
+        .filter(models.FileAsset.stored_name == payload.stored_name)
+        .first()
+    )
+    if existing:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload already finalized")
+    pending = (
+        db.query(models.PendingUpload)
+        .filter(
+            models.PendingUpload.owner_id == current_user.id,
+            models.PendingUpload.stored_name == payload.stored_name,
+            models.PendingUpload.expires_at > datetime.now(timezone.utc),
+        )
+        # Held until commit so housekeeping cannot purge the object mid-finalize
+        .with_for_update()
+        .first()
+    )
+    if not pending:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found or expired"
+        )
+
+    metadata = storage.get_object_metadata(storage_dir, payload.stored_name)
+    if metadata is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Uploaded file not found")
+    size = int(metadata.get("size") or 0)
+    if not size or size > settings.max_upload_size_bytes:
+        storage.delete_file(storage_dir, payload.stored_name)
+        db.delete(pending)
+        db.commit()
+        if not size:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty file")
+        raise _file_too_large()
+
+    content_type = _fit_content_type(payload.content_type or metadata.get("mimetype"))
+    asset = models.FileAsset(
+        display_name=payload.display_name,
+        stored_name=payload.stored_name,
+        content_type=content_type,
+        size=size,
+        owner_id=current_user.id,
+    )
+    db.add(asset)
+    db.delete(pending)
+    _publish_change(db, "file.created", asset)
     db.commit()
     db.refresh(asset)
+    if content_type and content_type.startswith("image/"):
+        background_tasks.add_task(_attach_thumbnail, asset.id, storage_dir, asset.stored_name)
     return asset
 
 
 @router.get("", response_model=schemas.FileListResponse)
-def list_files(
+def list_files(  # pylint: disable=too-many-arguments,too-many-positional-arguments
     limit: int = Query(default=10, le=100),
     offset: int = Query(default=0, ge=0),
     sort: Optional[str] = Query(default="desc", regex="^(asc|desc)$"),
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    query = db.query(models.FileAsset).filter(models.FileAsset.owner_id == current_user.id)
-    total = query.count()
+    # The per-user list version (row count + latest update) doubles as the total
+    total, last_updated_at = (
+        db.query(func.count(models.FileAsset.id), func.max(models.FileAsset.updated_at))
+        .filter(models.FileAsset.owner_id == current_user.id)
+        .one()
+    )
+    etag = _weak_etag(current_user.id.hex, total, last_updated_at, limit, offset, sort)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
     order = (
         models.FileAsset.created_at.asc() if sort == "asc" else models.FileAsset.created_at.desc()
     )
-    items = query.order_by(order).offset(offset).limit(limit).all()
-    return schemas.FileListResponse(
-        total=total, items=[schemas.FileOut.model_validate(item) for item in items]
+    rows = (
+        db.execute(
+            select(*_FILE_OUT_COLUMNS)
+            .where(models.FileAsset.owner_id == current_user.id)
+            .order_by(order)
+            .offset(offset)
+            .limit(limit)
+        )
+        # Plain mappings validate faster than attribute lookups on row tuples
+        .mappings()
+        .all()
+    )
+    items = schemas.file_out_list_adapter.validate_python(rows)
+    # Returning the response directly skips FastAPI's second response_model pass
+    return ORJSONResponse(
+        content={"total": total, "items": schemas.file_out_list_adapter.dump_python(items)},
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"},
+    )
+
+
+def _encode_cursor(asset: models.FileAsset) -> str:
+    raw = f"{asset.created_at.isoformat()}|{asset.id.hex}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at_raw, id_raw = raw.split("|", 1)
+        return datetime.fromisoformat(created_at_raw), UUID(id_raw)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from exc
+
+
+def _content_type_filter(content_type: str):
+    # "image/*" matches every image subtype
+    if content_type.endswith("/*"):
+        return models.FileAsset.content_type.startswith(content_type[:-1], autoescape=True)
+    return models.FileAsset.content_type == content_type
+
+
+def _search_query(db: Session, owner_id: UUID, params: schemas.FileSearchParams):
+    """Build the search query; fetches one extra row to tell whether another page exists."""
+    asset = models.FileAsset
+    query = db.query(asset).filter(asset.owner_id == owner_id)
+    if params.q:
+        # ILIKE patterns are served by the display_name trigram index
+        if params.match == "prefix":
+            query = query.filter(asset.display_name.istartswith(params.q, autoescape=True))
+        else:
+            query = query.filter(asset.display_name.icontains(params.q, autoescape=True))
+    if params.content_type:
+        query = query.filter(_content_type_filter(params.content_type))
+    if params.min_size is not None:
+        query = query.filter(asset.size >= params.min_size)
+    if params.max_size is not None:
+        query = query.filter(asset.size <= params.max_size)
+    if params.created_after is not None:
+        query = query.filter(asset.created_at >= params.created_after)
+    if params.created_before is not None:
+        query = query.filter(asset.created_at < params.created_before)
+
+    sort_key = tuple_(asset.created_at, asset.id)
+    ascending = params.sort == "asc"
+    if params.cursor:
+        cursor_key = tuple_(*_decode_cursor(params.cursor))
+        query = query.filter(sort_key > cursor_key if ascending else sort_key < cursor_key)
+    if ascending:
+        query = query.order_by(asset.created_at.asc(), asset.id.asc())
+    else:
+        query = query.order_by(asset.created_at.desc(), asset.id.desc())
+    return query.limit(params.limit + 1)
+
+
+@router.get("/search", response_model=schemas.FileSearchResponse)
+def search_files(
+    params: Annotated[schemas.FileSearchParams, Query()],
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    limit = params.limit
+    items = _search_query(db, current_user.id, params).all()
+    next_cursor = _encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return schemas.FileSearchResponse(
+        items=[schemas.FileOut.model_validate(item) for item in items[:limit]],
+        next_cursor=next_cursor,
+    )
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _file_event_stream(request: Request, user_id: UUID, last_event_id: Optional[int]):
+    subscription = events.broker.subscribe(user_id, last_event_id)
+    try:
+        for event in subscription.backlog:
+            yield event.to_sse()
+        while not await request.is_disconnected():
+            if subscription.needs_reset:
+                # Events were missed; the client refetches the list, which covers anything queued
+                subscription.needs_reset = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                yield events.reset_sse(events.broker.last_id())
+                continue
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.change_feed_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield event.to_sse()
+    finally:
+        events.broker.unsubscribe(subscription)
+
+
+@router.get("/events", summary="Stream file changes as server-sent events")
+async def stream_file_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Push `file.created`, `file.updated` and `file.deleted` events for the caller's files.
+
+    Reconnecting with `Last-Event-ID` replays what was missed; a `reset` event means the
+    gap could not be replayed and the client should refetch its list.
+    """
+    user_id = current_user.id
+    # The stream can stay open for hours; do not hold a pooled connection meanwhile
+    db.close()
+    return StreamingResponse(
+        _file_event_stream(request, user_id, _parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/{file_id}", response_model=schemas.FileOut)
 def get_file(
     file_id: UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    asset = (
-        db.query(models.FileAsset)
-        .filter(models.FileAsset.owner_id == current_user.id, models.FileAsset.id == file_id)
-        .first()
+    ownership_filter = (
+        models.FileAsset.owner_id == current_user.id,
+        models.FileAsset.id == file_id,
     )
+    if if_none_match:
+        # Revalidate against updated_at alone before loading the full row
+        version = db.query(models.FileAsset.updated_at).filter(*ownership_filter).first()
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        etag = _weak_etag(file_id.hex, version.updated_at)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+
+    asset = db.query(models.FileAsset).filter(*ownership_filter).first()
     if not asset:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    response.headers["ETag"] = _weak_etag(file_id.hex, asset.updated_at)
+    response.headers["Cache-Control"] = "private, no-cache"
     return asset
 
 
@@ -120,6 +474,7 @@ def update_file(
     asset.display_name = payload.display_name
     asset.updated_at = datetime.now(timezone.utc)
     db.add(asset)
+    _publish_change(db, "file.updated", asset)
     db.commit()
     db.refresh(asset)
     return asset
@@ -140,10 +495,109 @@ def delete_file(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
     storage.delete_file(Path(current_user.id.hex), asset.stored_name, asset.thumbnail_name)
     db.delete(asset)
+    events.broker.publish(db, current_user.id, "file.deleted", {"id": str(file_id)})
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+def _resolve_copy_target(
+    db: Session, current_user: models.User, target_email: Optional[str]
+) -> models.User:
+    if not target_email or target_email == current_user.email:
+        return current_user
+    target = db.query(models.User).filter(models.User.email == target_email).first()
+    if not target:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Target user not found")
+    return target
+
+
+def _copy_asset(
+    asset: models.FileAsset, target: models.User, display_name: Optional[str] = None
+) -> models.FileAsset:
+    stored_name, thumbnail_name = storage.copy_file(
+        Path(asset.owner_id.hex), asset.stored_name, asset.thumbnail_name, Path(target.id.hex)
+    )
+    return models.FileAsset(
+        display_name=display_name or asset.display_name,
+        stored_name=stored_name,
+        thumbnail_name=thumbnail_name,
+        content_type=asset.content_type,
+        size=asset.size,
+        width=asset.width,
+        height=asset.height,
+        placeholder=asset.placeholder,
+        owner_id=target.id,
+    )
+
+
+def _discard_copies(target: models.User, copies: List[models.FileAsset]) -> None:
+    """Delete copied objects that no committed row points to."""
+    for copy in copies:
+        storage.delete_file(Path(target.id.hex), copy.stored_name, copy.thumbnail_name)
+
+
+@router.post("/copy", response_model=List[schemas.FileOut], status_code=status.HTTP_201_CREATED)
+def bulk_copy_files(
+    payload: schemas.FileBulkCopyRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    target = _resolve_copy_target(db, current_user, payload.target_email)
+    file_ids = list(dict.fromkeys(payload.file_ids))
+    assets = (
+        db.query(models.FileAsset)
+        .filter(models.FileAsset.owner_id == current_user.id, models.FileAsset.id.in_(file_ids))
+        .all()
+    )
+    if len(assets) != len(file_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    assets_by_id = {asset.id: asset for asset in assets}
+
+    copies: List[models.FileAsset] = []
+    try:
+        for file_id in file_ids:
+            copies.append(_copy_asset(assets_by_id[file_id], target))
+        db.add_all(copies)
+        for copy in copies:
+            _publish_change(db, "file.created", copy)
+        db.commit()
+    except Exception:
+        db.rollback()
+        _discard_copies(target, copies)
+        raise
+    for copy in copies:
+        db.refresh(copy)
+    return copies
+
+
+@router.post("/{file_id}/copy", response_model=schemas.FileOut, status_code=status.HTTP_201_CREATED)
+def copy_file(
+    file_id: UUID,
+    payload: schemas.FileCopyRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    asset: Optional[models.FileAsset] = (
+        db.query(models.FileAsset)
+        .filter(models.FileAsset.owner_id == current_user.id, models.FileAsset.id == file_id)
+        .first()
+    )
+    if not asset:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    target = _resolve_copy_target(db, current_user, payload.target_email)
+    copy = _copy_asset(asset, target, payload.display_name)
+    try:
+        db.add(copy)
+        _publish_change(db, "file.created", copy)
+        db.commit()
+    except Exception:
+        db.rollback()
+        _discard_copies(target, [copy])
+        raise
+    db.refresh(copy)
+    return copy
+
+
 @router.get("/{file_id}/download")
 def download_file(
     file_id: UUID,
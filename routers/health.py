@@ -1,7 +1,13 @@
+import resource
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+import warmup
+from admission import upload_admission
+from events import broker
+from storage import storage_calls
 from database import get_db
 
 router = APIRouter(tags=["health"])
@@ -14,6 +20,11 @@ def live_check():
 
 @router.get("/healthz", summary="Readiness probe")
 def health_check(db: Session = Depends(get_db)):
+    if not warmup.is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="warming_up",
+        )
     try:
         db.execute(text("SELECT 1"))
     except Exception as exc:  # pylint: disable=broad-except
@@ -21,4 +32,17 @@ def health_check(db: Session = Depends(get_db)):
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="database_unavailable",
         ) from exc
-    return {"status": "ok"}
+    # Storage outages degrade uploads/downloads but should not pull the worker out of rotation
+    return {"status": "ok", "storage": storage_calls.breaker.state}
+
+
+@router.get("/metrics", summary="Worker metrics")
+def metrics():
+    return {
+        "uploads": upload_admission.snapshot(),
+        "warmup": warmup.snapshot(),
+        "storage": storage_calls.snapshot(),
+        "change_feed": broker.snapshot(),
+        # ru_maxrss is reported in KiB on Linux
+        "process": {"peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024},
+    }
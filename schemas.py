@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter
 
 
 class DBModel(BaseModel):
@@ -42,12 +42,42 @@ class FileUpdate(FileBase):
     pass
 
 
+class UploadUrlRequest(BaseModel):
+    filename: str = Field(max_length=500)
+    size: int = Field(gt=0)
+
+
+class UploadUrlOut(BaseModel):
+    stored_name: str
+    upload_url: str
+    token: str
+
+
+class UploadFinalize(FileBase):
+    stored_name: str = Field(max_length=537)
+    content_type: Optional[str] = Field(default=None, max_length=255)
+
+
+class FileCopyRequest(BaseModel):
+    # Copy into another user's space; defaults to the caller's own
+    target_email: Optional[EmailStr] = Field(default=None, max_length=254)
+    display_name: Optional[str] = Field(default=None, max_length=500)
+
+
+class FileBulkCopyRequest(BaseModel):
+    file_ids: List[UUID] = Field(min_length=1, max_length=100)
+    target_email: Optional[EmailStr] = Field(default=None, max_length=254)
+
+
 class FileOut(FileBase, DBModel):
     id: UUID
     stored_name: str = Field(max_length=537)
     thumbnail_name: Optional[str] = Field(default=None, max_length=600)
     size: int
-    content_type: Optional[str] = Field(max_length=16)
+    content_type: Optional[str] = Field(max_length=255)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: Optional[str] = Field(default=None, max_length=512)
     created_at: datetime
     updated_at: datetime
 
@@ -55,3 +85,25 @@ class FileOut(FileBase, DBModel):
 class FileListResponse(BaseModel):
     total: int
     items: List[FileOut]
+
+
+# Built once at import; validates/dumps a whole page in a single pydantic-core call
+file_out_list_adapter = TypeAdapter(List[FileOut])
+
+
+class FileSearchParams(BaseModel):
+    q: Optional[str] = Field(default=None, min_length=1, max_length=500)
+    match: Literal["contains", "prefix"] = "contains"
+    content_type: Optional[str] = Field(default=None, max_length=255)
+    min_size: Optional[int] = Field(default=None, ge=0)
+    max_size: Optional[int] = Field(default=None, ge=0)
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    limit: int = Field(default=10, ge=1, le=100)
+    cursor: Optional[str] = None
+    sort: Literal["asc", "desc"] = "desc"
+
+
+class FileSearchResponse(BaseModel):
+    items: List[FileOut]
+    next_cursor: Optional[str] = None
@@ -1,14 +1,55 @@
+import re
+import tempfile
 import uuid
-from io import BytesIO
+from io import FileIO
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Callable, NamedTuple, Optional, Tuple, TypeVar, Union
 
 from fastapi import HTTPException, UploadFile, status
-from PIL import Image
+from storage3.exceptions import StorageApiError
 
 from config import settings
+from imaging import render_derivatives
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, is_transient
 from vendor.supabase_client import get_supabase_client
 
+T = TypeVar("T")
+
+_STORED_NAME_PATTERN = re.compile(r"^[0-9a-f]{32}(\.[^/\\?# ]*)?$")
+
+storage_calls = ResilientCaller(
+    breaker=CircuitBreaker(
+        failure_threshold=settings.storage_breaker_failure_threshold,
+        reset_timeout=settings.storage_breaker_reset_seconds,
+    ),
+    max_workers=settings.storage_max_workers,
+    retry_backoff=settings.storage_retry_backoff_seconds,
+)
+
+
+def _call_storage(
+    fn: Callable[[], T], *, transfer: bool = False, idempotent: bool = False, hedge: bool = False
+) -> T:
+    """Run a Supabase call through the storage timeouts, retries, hedging and breaker."""
+    try:
+        return storage_calls.call(
+            fn,
+            timeout=(
+                settings.storage_transfer_timeout_seconds
+                if transfer
+                else settings.storage_timeout_seconds
+            ),
+            retries=settings.storage_retries if idempotent else 0,
+            hedge_after=settings.storage_hedge_after_seconds if hedge else None,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        if isinstance(exc, CircuitOpenError) or is_transient(exc):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Storage is temporarily unavailable",
+            ) from exc
+        raise
+
 
 def _build_object_path(storage_dir: Path, stored_name: str) -> str:
     """Build the Supabase object key using the configured prefix (storage_dir)."""
@@ -16,12 +57,17 @@ def _build_object_path(storage_dir: Path, stored_name: str) -> str:
     return f"{prefix}/{stored_name}" if prefix else stored_name
 
 
-def _upload_to_bucket(bucket: str, object_path: str, data: bytes, content_type: str) -> None:
+def _upload_to_bucket(
+    bucket: str, object_path: str, data: Union[bytes, FileIO], content_type: str
+) -> None:
     supabase = get_supabase_client()
-    response = supabase.storage.from_(bucket).upload(
-        object_path,
-        data,
-        file_options={"content-type": content_type},
+    response = _call_storage(
+        lambda: supabase.storage.from_(bucket).upload(
+            object_path,
+            data,
+            file_options={"content-type": content_type},
+        ),
+        transfer=True,
     )
     if getattr(response, "error", None):
         raise HTTPException(
@@ -30,17 +76,11 @@ def _upload_to_bucket(bucket: str, object_path: str, data: bytes, content_type:
         )
 
 
-def _generate_thumbnail(data: bytes) -> Optional[bytes]:
-    with Image.open(BytesIO(data)) as image:
-        if image.width == 0 or image.height == 0:
-            return None
-        ratio = 64 / float(image.width)
-        new_height = max(1, int(image.height * ratio))
-        thumb = image.copy()
-        thumb.thumbnail((64, new_height))
-        buf = BytesIO()
-        thumb.save(buf, format="PNG")
-        return buf.getvalue()
+class StoredImage(NamedTuple):
+    thumbnail_name: Optional[str]
+    width: int
+    height: int
+    placeholder: str
 
 
 def _build_stored_name(filename: Optional[str]) -> str:
@@ -52,45 +92,175 @@ def _build_stored_name(filename: Optional[str]) -> str:
     return f"{uuid.uuid4().hex}{safe_suffix.lower()}"
 
 
-def save_upload_file(upload: UploadFile, storage_dir: Path) -> Tuple[str, Optional[str]]:
-    """Upload file to Supabase Storage; returns (stored_name, thumbnail_name)."""
+def save_upload_file(upload: UploadFile, storage_dir: Path) -> Tuple[str, Optional[StoredImage]]:
+    """Upload file to Supabase Storage; returns (stored_name, image details for images)."""
     stored_name = _build_stored_name(upload.filename)
     object_path = _build_object_path(storage_dir, stored_name)
 
-    data = upload.file.read()
+    # fileno() rolls the spooled upload over to disk; httpx then streams it in small chunks
+    # instead of the whole body being copied into memory
+    with FileIO(upload.file.fileno(), mode="rb", closefd=False) as stream:
+        _upload_to_bucket(
+            settings.supabase_bucket,
+            object_path,
+            stream,
+            upload.content_type or "application/octet-stream",
+        )
+
+    image = None
+    if upload.content_type and upload.content_type.startswith("image/"):
+        upload.file.seek(0)
+        image = _store_image_derivatives(storage_dir, stored_name, upload.file)
+
+    return stored_name, image
 
-    _upload_to_bucket(
-        settings.supabase_bucket,
-        object_path,
-        data,
-        upload.content_type or "application/octet-stream",
+
+def _store_image_derivatives(
+    storage_dir: Path, stored_name: str, source: BinaryIO
+) -> Optional[StoredImage]:
+    derivatives = render_derivatives(source)
+    if not derivatives:
+        return None
+    thumbnail_name: Optional[str] = f"{stored_name}.png"
+    thumb_path = _build_object_path(storage_dir, thumbnail_name)
+    try:
+        _upload_to_bucket(
+            settings.supabase_thumbnail_bucket,
+            thumb_path,
+            derivatives.thumbnail,
+            "image/png",
+        )
+    except HTTPException:
+        thumbnail_name = None
+    return StoredImage(
+        thumbnail_name=thumbnail_name,
+        width=derivatives.width,
+        height=derivatives.height,
+        placeholder=derivatives.placeholder,
     )
 
-    thumbnail_name = None
-    if (
-        upload.content_type
-        and upload.content_type.startswith("image/")
-        and (thumb_data := _generate_thumbnail(data))
-    ):
-        thumbnail_name = f"{stored_name}.png"
-        thumb_path = _build_object_path(storage_dir, thumbnail_name)
+
+def create_upload_url(filename: Optional[str], storage_dir: Path) -> Tuple[str, str, str]:
+    """Reserve an object key and sign a direct upload to it; returns (stored_name, url, token)."""
+    supabase = get_supabase_client()
+    stored_name = _build_stored_name(filename)
+    object_path = _build_object_path(storage_dir, stored_name)
+    response = _call_storage(
+        lambda: supabase.storage.from_(settings.supabase_bucket).create_signed_upload_url(
+            object_path
+        ),
+        idempotent=True,
+    )
+    url = response.get("signed_url")
+    token = response.get("token")
+    if not url or not token:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to generate signed upload URL",
+        )
+    return stored_name, url, token
+
+
+def is_valid_stored_name(stored_name: str) -> bool:
+    return bool(_STORED_NAME_PATTERN.match(stored_name))
+
+
+def get_object_metadata(storage_dir: Path, stored_name: str) -> Optional[dict]:
+    """Return the stored object's metadata (size, mimetype, ...) or None if it does not exist."""
+    supabase = get_supabase_client()
+    prefix = storage_dir.as_posix().strip("/")
+    entries = _call_storage(
+        lambda: supabase.storage.from_(settings.supabase_bucket).list(
+            prefix, {"search": stored_name, "limit": 1}
+        ),
+        idempotent=True,
+    )
+    for entry in entries:
+        if entry.get("name") == stored_name:
+            return entry.get("metadata") or {}
+    return None
+
+
+def _download_object(storage_dir: Path, stored_name: str) -> BinaryIO:
+    """Stream a stored object into an anonymous temporary file, rewound for reading."""
+    supabase = get_supabase_client()
+    # The client's download() buffers the whole body; a short-lived signed URL can be streamed
+    url = get_signed_url(storage_dir, stored_name, expires_in=60)
+
+    def fetch() -> BinaryIO:
+        target = tempfile.TemporaryFile()
+        try:
+            with supabase.storage.session.stream("GET", url) as response:
+                if response.is_error:
+                    raise StorageApiError(
+                        "Failed to download object", "download_failed", response.status_code
+                    )
+                for chunk in response.iter_bytes():
+                    target.write(chunk)
+        except BaseException:
+            target.close()
+            raise
+        target.seek(0)
+        return target
+
+    return _call_storage(fetch, transfer=True, idempotent=True)
+
+
+def create_thumbnail_from_object(storage_dir: Path, stored_name: str) -> Optional[StoredImage]:
+    """Download an already stored image and store its thumbnail and image details."""
+    with _download_object(storage_dir, stored_name) as source:
+        return _store_image_derivatives(storage_dir, stored_name, source)
+
+
+def describe_stored_image(storage_dir: Path, stored_name: str) -> Optional[StoredImage]:
+    """Derive dimensions and placeholder of a stored image without touching its thumbnail."""
+    with _download_object(storage_dir, stored_name) as source:
+        derivatives = render_derivatives(source)
+    if not derivatives:
+        return None
+    return StoredImage(
+        thumbnail_name=None,
+        width=derivatives.width,
+        height=derivatives.height,
+        placeholder=derivatives.placeholder,
+    )
+
+
+def copy_file(
+    source_dir: Path, stored_name: str, thumbnail_name: Optional[str], target_dir: Path
+) -> Tuple[str, Optional[str]]:
+    """Copy an object (and its thumbnail) inside storage; returns the new names."""
+    supabase = get_supabase_client()
+    new_stored_name = _build_stored_name(stored_name)
+    _call_storage(
+        lambda: supabase.storage.from_(settings.supabase_bucket).copy(
+            _build_object_path(source_dir, stored_name),
+            _build_object_path(target_dir, new_stored_name),
+        )
+    )
+
+    new_thumbnail_name: Optional[str] = None
+    if thumbnail_name:
+        new_thumbnail_name = f"{new_stored_name}.png"
         try:
-            _upload_to_bucket(
-                settings.supabase_thumbnail_bucket,
-                thumb_path,
-                thumb_data,
-                "image/png",
+            _call_storage(
+                lambda: supabase.storage.from_(settings.supabase_thumbnail_bucket).copy(
+                    _build_object_path(source_dir, thumbnail_name),
+                    _build_object_path(target_dir, new_thumbnail_name),
+                )
             )
         except HTTPException:
-            thumbnail_name = None
-
-    return stored_name, thumbnail_name
+            new_thumbnail_name = None
+    return new_stored_name, new_thumbnail_name
 
 
 def delete_file(storage_dir: Path, stored_name: str, thumbnail_name: Optional[str] = None) -> None:
     supabase = get_supabase_client()
     object_path = _build_object_path(storage_dir, stored_name)
-    response = supabase.storage.from_(settings.supabase_bucket).remove([object_path])
+    response = _call_storage(
+        lambda: supabase.storage.from_(settings.supabase_bucket).remove([object_path]),
+        idempotent=True,
+    )
     if getattr(response, "error", None):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -98,7 +268,12 @@ def delete_file(storage_dir: Path, stored_name: str, thumbnail_name: Optional[st
         )
     if thumbnail_name:
         thumb_path = _build_object_path(storage_dir, thumbnail_name)
-        supabase.storage.from_(settings.supabase_thumbnail_bucket).remove([thumb_path])
+        _call_storage(
+            lambda: supabase.storage.from_(settings.supabase_thumbnail_bucket).remove(
+                [thumb_path]
+            ),
+            idempotent=True,
+        )
 
 
 def get_signed_url(
@@ -107,7 +282,13 @@ def get_signed_url(
     supabase = get_supabase_client()
     bucket = settings.supabase_thumbnail_bucket if thumbnail else settings.supabase_bucket
     object_path = _build_object_path(storage_dir, stored_name)
-    response = supabase.storage.from_(bucket).create_signed_url(object_path, expires_in=expires_in)
+    response = _call_storage(
+        lambda: supabase.storage.from_(bucket).create_signed_url(
+            object_path, expires_in=expires_in
+        ),
+        idempotent=True,
+        hedge=True,
+    )
     if getattr(response, "error", None):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,125 @@
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator
+
+import httpx
+import orjson
+import pytest
+
+# Settings are read at import time, so point the app at throwaway local resources first
+_workdir = tempfile.mkdtemp(prefix="file-manager-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["JWT_SECRET_KEY"] = "test-secret"
+os.environ["SUPABASE_URL"] = "http://storage.test"
+os.environ["SUPABASE_ACCESS_KEY"] = "test-key"
+os.environ["CHANGE_FEED_BACKEND"] = "local"
+os.environ["ACCESS_LOG_ENABLED"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from supabase import Client, ClientOptions, create_client  # noqa: E402
+
+import dependencies  # noqa: E402
+import models  # noqa: E402
+import storage  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+
+_OBJECT_PATH = re.compile(r"^/storage/v1/object/(?P<action>sign/|list/)?(?P<key>[^/]+(/.+)?)$")
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _FileStream(httpx.SyncByteStream):
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self._path.open("rb") as source:
+            while chunk := source.read(_STREAM_CHUNK_SIZE):
+                yield chunk
+
+
+class LocalStorageTransport(httpx.BaseTransport):
+    """Stands in for Supabase Storage on local disk; streams bodies chunk by chunk both ways."""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        # "<bucket>/<object path>" -> file holding the object
+        self.objects: Dict[str, Path] = {}
+
+    def put(self, key: str, source: Path) -> None:
+        target = self._directory / key.replace("/", "_")
+        shutil.copyfile(source, target)
+        self.objects[key] = target
+
+    def _store(self, key: str, request: httpx.Request) -> httpx.Response:
+        target = self._directory / key.replace("/", "_")
+        with target.open("wb") as out:
+            for chunk in request.stream:
+                out.write(chunk)
+        self.objects[key] = target
+        return httpx.Response(200, json={"Key": key, "Id": key})
+
+    def _list(self, bucket: str, request: httpx.Request) -> httpx.Response:
+        query = orjson.loads(request.read())
+        prefix = f"{bucket}/{query['prefix']}/"
+        entries = [
+            {"name": key[len(prefix):], "metadata": {"size": path.stat().st_size}}
+            for key, path in self.objects.items()
+            if key.startswith(prefix) and query.get("search", "") in key[len(prefix):]
+        ]
+        return httpx.Response(200, json=entries)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        match = _OBJECT_PATH.match(request.url.path)
+        action, key = (match["action"], match["key"]) if match else ("", "")
+        if action == "list/":
+            return self._list(key, request)
+        if action == "sign/" and request.method == "POST":
+            return httpx.Response(200, json={"signedURL": f"/object/sign/{key}?token=test"})
+        if request.method == "GET" and key in self.objects:
+            return httpx.Response(200, stream=_FileStream(self.objects[key]))
+        if match and not action and request.method in {"POST", "PUT"}:
+            return self._store(key, request)
+        if match and request.method == "DELETE":
+            return httpx.Response(200, json=[])
+        return httpx.Response(404, json={"statusCode": "404", "error": "not_found"})
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _tables():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path) -> LocalStorageTransport:
+    transport = LocalStorageTransport(tmp_path)
+    client: Client = create_client(
+        os.environ["SUPABASE_URL"],
+        os.environ["SUPABASE_ACCESS_KEY"],
+        options=ClientOptions(httpx_client=httpx.Client(transport=transport)),
+    )
+    monkeypatch.setattr(storage, "get_supabase_client", lambda: client)
+    return transport
+
+
+@pytest.fixture
+def user():
+    db = SessionLocal()
+    try:
+        account = models.User(email=f"{os.urandom(6).hex()}@example.com", hashed_password="-")
+        db.add(account)
+        db.commit()
+        db.refresh(account)
+        db.expunge(account)
+    finally:
+        db.close()
+    app.dependency_overrides[dependencies.get_current_user] = lambda: account
+    yield account
+    app.dependency_overrides.pop(dependencies.get_current_user, None)
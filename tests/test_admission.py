@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+from admission import MULTIPART_ALLOWANCE_BYTES, UploadAdmissionController
+from config import settings
+from main import app
+
+
+def _controller() -> UploadAdmissionController:
+    return UploadAdmissionController(
+        max_inflight=8,
+        max_inflight_bytes=200,
+        max_inflight_per_user=2,
+        max_inflight_bytes_per_user=100,
+    )
+
+
+def test_first_upload_of_a_user_is_held_to_the_per_user_byte_cap():
+    controller = _controller()
+    user_id = uuid.uuid4()
+    rejection = controller.try_acquire(user_id, 101)
+    assert rejection is not None and rejection.status_code == 429
+    assert controller.try_acquire(user_id, 100) is None
+
+
+def _post_upload(content_length: int) -> int:
+    """Send only the headers of an upload and return the response status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/files/upload",
+        "raw_path": b"/files/upload",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"multipart/form-data; boundary=x"),
+            (b"content-length", str(content_length).encode()),
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    messages = []
+
+    async def receive():
+        # The body never arrives; an oversized upload must be answered without it
+        await asyncio.sleep(5)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asyncio.wait_for(app(scope, receive, send), timeout=2)
+
+    asyncio.run(run())
+    return messages[0]["status"]
+
+
+def test_declared_length_over_the_upload_limit_is_rejected_before_reserving():
+    limit = settings.max_upload_size_bytes + MULTIPART_ALLOWANCE_BYTES
+    assert _post_upload(5_000_000_000) == 413
+    assert _post_upload(limit + 1) == 413
@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+import security
+from database import SessionLocal
+from main import app
+
+
+@pytest.fixture
+def client(user):  # pylint: disable=redefined-outer-name
+    # The idempotency middleware authenticates before the route, so it needs a real session
+    token = security.create_access_token(user.email, user.id)
+    db = SessionLocal()
+    try:
+        db.add(models.UserSession(user_id=user.id, jti=security.decode_access_token(token).jti))
+        db.commit()
+    finally:
+        db.close()
+    with TestClient(app) as test_client:
+        test_client.cookies.set("access_token", token)
+        test_client.headers["Authorization"] = f"Bearer {token}"
+        yield test_client
+
+
+def _upload(client, key: str, filename: str, content: bytes = b"hello"):  # pylint: disable=redefined-outer-name
+    return client.post(
+        "/files/upload",
+        headers={"Idempotency-Key": key},
+        files={"file": (filename, content, "text/plain")},
+    )
+
+
+def test_upload_retry_is_replayed_and_key_reuse_for_another_file_is_refused(
+    client, local_storage
+):  # pylint: disable=redefined-outer-name,unused-argument
+    first = _upload(client, "upload-1", "a.txt")
+    assert first.status_code == 201, first.text
+
+    retry = _upload(client, "upload-1", "a.txt")
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+    reused = _upload(client, "upload-1", "b.txt")
+    assert reused.status_code == 422
+    assert reused.json()["detail"]["code"] == "idempotency_key_reused"
+
+
+def test_rename_with_a_reused_key_and_a_different_name_is_refused(
+    client, local_storage
+):  # pylint: disable=redefined-outer-name,unused-argument
+    file_id = _upload(client, "upload-2", "a.txt").json()["id"]
+    headers = {"Idempotency-Key": "rename-1"}
+
+    renamed = client.put(f"/files/{file_id}", headers=headers, json={"display_name": "b.txt"})
+    assert renamed.status_code == 200, renamed.text
+    retry = client.put(f"/files/{file_id}", headers=headers, json={"display_name": "b.txt"})
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    reused = client.put(f"/files/{file_id}", headers=headers, json={"display_name": "c.txt"})
+    assert reused.status_code == 422
+    assert reused.json()["detail"]["code"] == "idempotency_key_reused"
+    assert client.get(f"/files/{file_id}").json()["display_name"] == "b.txt"
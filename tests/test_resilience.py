@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+from fastapi.concurrency import run_in_threadpool
+
+from resilience import CircuitBreaker, ResilientCaller
+
+
+@pytest.fixture
+def caller() -> ResilientCaller:
+    return ResilientCaller(
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=1.0),
+        max_workers=2,
+        retry_backoff=0.01,
+    )
+
+
+def test_call_refuses_to_block_the_event_loop(caller):  # pylint: disable=redefined-outer-name
+    async def on_loop():
+        return caller.call(lambda: "ok", timeout=1.0)
+
+    with pytest.raises(RuntimeError, match="event loop"):
+        asyncio.run(on_loop())
+    assert caller.snapshot()["calls"] == 0
+
+
+def test_call_runs_from_the_threadpool(caller):  # pylint: disable=redefined-outer-name
+    async def off_loop():
+        return await run_in_threadpool(caller.call, lambda: "ok", timeout=1.0)
+
+    assert asyncio.run(off_loop()) == "ok"
@@ -0,0 +1,208 @@
+"""Peak memory of `POST /files/upload` must stay within a small multiple of the chunk size.
+
+Uploads stream through the ASGI app into a local storage stand-in. Each case checks the
+peak traced allocation of a single upload, the peak of a burst of concurrent uploads and,
+on Linux, the worker's RSS growth during the burst. The burst must actually overlap in the
+worker, which is checked against admission control's in-flight count. Finalizing a direct
+upload, which downloads the stored image again for its thumbnail, is held to the same
+budget. Tune with environment variables:
+
+    UPLOAD_MEMORY_MAX_CHUNKS     allowed peak per upload, in chunks (default 4)
+    UPLOAD_MEMORY_CONCURRENCY    uploads in the concurrent burst (default 4)
+    UPLOAD_MEMORY_PAYLOAD_MB     size of the non-image payload (default 24)
+"""
+
+import asyncio
+import os
+import threading
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+import pytest
+from PIL import Image
+
+import models
+from admission import upload_admission
+from database import SessionLocal
+from main import app
+
+# Starlette spools multipart files to disk past 1 MiB, and httpx streams request bodies in
+# smaller pieces, so no stage of the upload path should hold more than this at once
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNKS_PER_UPLOAD = float(os.environ.get("UPLOAD_MEMORY_MAX_CHUNKS", "4"))
+CONCURRENCY = int(os.environ.get("UPLOAD_MEMORY_CONCURRENCY", "4"))
+PAYLOAD_BYTES = int(float(os.environ.get("UPLOAD_MEMORY_PAYLOAD_MB", "24")) * 1024 * 1024)
+# 20 megapixels of noise: a ~20 MiB JPEG, inside the default thumbnail pixel budget
+IMAGE_SIZE = (5000, 4000)
+_STATM = Path("/proc/self/statm")
+
+
+@pytest.fixture(scope="module")
+def payloads(tmp_path_factory) -> Dict[str, Tuple[Path, str]]:
+    directory = tmp_path_factory.mktemp("payloads")
+    binary = directory / "archive.bin"
+    with binary.open("wb") as out:
+        for _ in range(PAYLOAD_BYTES // CHUNK_SIZE):
+            out.write(os.urandom(CHUNK_SIZE))
+    image = directory / "photo.jpg"
+    noise = os.urandom(IMAGE_SIZE[0] * IMAGE_SIZE[1] * 3)
+    Image.frombytes("RGB", IMAGE_SIZE, noise).save(image, format="JPEG", quality=95)
+    return {"binary": (binary, "application/octet-stream"), "image": (image, "image/jpeg")}
+
+
+class BurstSampler(threading.Thread):
+    """Polls the uploads in flight and, where available, the resident set size.
+
+    Records the most uploads admission control held at once and the RSS growth over the
+    starting value (None when /proc is not available).
+    """
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self._stop_event = threading.Event()
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._baseline = self._rss()
+        self.growth: Optional[int] = None if self._baseline is None else 0
+        self.inflight_peak = 0
+
+    def _rss(self) -> Optional[int]:
+        if not _STATM.exists():
+            return None
+        return int(_STATM.read_text(encoding="ascii").split()[1]) * self._page_size
+
+    def run(self) -> None:
+        while not self._stop_event.wait(0.002):
+            self.inflight_peak = max(
+                self.inflight_peak, upload_admission.snapshot()["inflight_uploads"]
+            )
+            rss = self._rss()
+            if rss is not None and self._baseline is not None:
+                self.growth = max(self.growth or 0, rss - self._baseline)
+
+    def __enter__(self) -> "BurstSampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+async def _upload(payload: Tuple[Path, str], count: int) -> list:
+    path, content_type = payload
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def send() -> dict:
+            with path.open("rb") as body:
+                response = await client.post(
+                    "/files/upload", files={"file": (path.name, body, content_type)}
+                )
+            assert response.status_code == 201, response.text
+            return response.json()
+
+        return await asyncio.gather(*(send() for _ in range(count)))
+
+
+def _traced_peak(payload: Tuple[Path, str], count: int) -> int:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        asyncio.run(_upload(payload, count))
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def _mib(nbytes: float) -> str:
+    return f"{nbytes / 1024 / 1024:.1f} MiB"
+
+
+@pytest.mark.parametrize("kind", ["binary", "image"])
+def test_upload_peak_memory_stays_within_chunk_budget(
+    kind, payloads, local_storage, user
+):  # pylint: disable=redefined-outer-name
+    payload = payloads[kind]
+    budget = MAX_CHUNKS_PER_UPLOAD * CHUNK_SIZE
+
+    # Warm up imports, pools and the thumbnail renderer before measuring
+    (created,) = asyncio.run(_upload(payload, 1))
+    if kind == "image":
+        assert created["width"] == IMAGE_SIZE[0] and created["thumbnail_name"]
+    stored = local_storage.objects[f"uploads/{user.id.hex}/{created['stored_name']}"]
+    # storage3 sends the body multipart-encoded, so the stored object carries the framing too
+    assert stored.stat().st_size >= payload[0].stat().st_size
+
+    with BurstSampler() as burst:
+        asyncio.run(_upload(payload, CONCURRENCY))
+    single_peak = _traced_peak(payload, 1)
+    burst_peak = _traced_peak(payload, CONCURRENCY)
+
+    print(
+        f"\n{kind} ({_mib(payload[0].stat().st_size)}): single upload peak "
+        f"{_mib(single_peak)}, {CONCURRENCY} concurrent peak {_mib(burst_peak)}, "
+        f"RSS growth {_mib(burst.growth) if burst.growth is not None else 'n/a'}, "
+        f"{burst.inflight_peak} in flight at once, budget {_mib(budget)} per upload"
+    )
+    # Otherwise the burst ran one upload after another and measured nothing about concurrency
+    assert burst.inflight_peak == CONCURRENCY
+    assert single_peak <= budget
+    assert burst_peak <= CONCURRENCY * budget
+    if burst.growth is not None:
+        assert burst.growth <= CONCURRENCY * budget
+
+
+def test_finalize_thumbnail_peak_memory_stays_within_chunk_budget(
+    payloads, local_storage, user
+):  # pylint: disable=redefined-outer-name
+    path, content_type = payloads["image"]
+    budget = MAX_CHUNKS_PER_UPLOAD * CHUNK_SIZE
+
+    async def finalize(stored_name: str) -> dict:
+        # As if the client had uploaded to the signed URL it was given
+        local_storage.put(f"uploads/{user.id.hex}/{stored_name}", path)
+        db = SessionLocal()
+        try:
+            db.add(
+                models.PendingUpload(
+                    owner_id=user.id,
+                    stored_name=stored_name,
+                    expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # The thumbnail is rendered in a background task that finishes before this returns
+            response = await client.post(
+                "/files/presigned-upload/finalize",
+                json={
+                    "stored_name": stored_name,
+                    "display_name": path.name,
+                    "content_type": content_type,
+                },
+            )
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    created = asyncio.run(finalize(f"{uuid.uuid4().hex}.jpg"))
+    assert f"thumbnails/{user.id.hex}/{created['stored_name']}.png" in local_storage.objects
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        asyncio.run(finalize(f"{uuid.uuid4().hex}.jpg"))
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    print(f"\nfinalize ({_mib(path.stat().st_size)}): peak {_mib(peak)}, budget {_mib(budget)}")
+    assert peak <= budget
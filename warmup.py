@@ -0,0 +1,60 @@
+import logging
+import time
+from io import BytesIO
+
+from PIL import Image
+from sqlalchemy import text
+
+from database import engine
+from imaging import start_render_server
+from vendor.supabase_client import get_supabase_client
+
+logger = logging.getLogger("uvicorn.error")
+
+_state = {"ready": False, "started_at": time.monotonic(), "cold_start_seconds": None}
+
+
+def mark_process_start() -> None:
+    """Restart the cold-start clock, e.g. in a freshly forked worker."""
+    _state.update(ready=False, started_at=time.monotonic(), cold_start_seconds=None)
+
+
+def preload_codecs() -> None:
+    """Register Pillow plugins and round-trip a tiny PNG so codec modules are imported."""
+    Image.init()
+    buf = BytesIO()
+    Image.new("RGB", (1, 1)).save(buf, format="PNG")
+    with Image.open(BytesIO(buf.getvalue())) as image:
+        image.load()
+
+
+def _warm_db_pool() -> None:
+    # Check out as many connections as the pool keeps so the first requests skip the handshake
+    pool_size = engine.pool.size()  # type: ignore[attr-defined]
+    connections = [engine.connect() for _ in range(pool_size)]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_up() -> None:
+    for step in (preload_codecs, start_render_server, _warm_db_pool, get_supabase_client):
+        try:
+            step()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Warmup step %s failed", step.__name__, exc_info=True)
+
+    cold_start_seconds = time.monotonic() - _state["started_at"]
+    _state.update(ready=True, cold_start_seconds=round(cold_start_seconds, 3))
+    logger.info("Worker ready; cold start took %.3fs", cold_start_seconds)
+
+
+def is_ready() -> bool:
+    return bool(_state["ready"])
+
+
+def snapshot() -> dict:
+    return {"ready": _state["ready"], "cold_start_seconds": _state["cold_start_seconds"]}